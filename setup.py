@@ -23,6 +23,7 @@ setup(
         "Programming Language :: Python :: 3.6",
     ],
     description="A tool for multicamera composition.",
+    entry_points={"console_scripts": ["mccp=multicamcomposepro.cli:main"]},
     license="MIT license",
     long_description=readme,
     include_package_data=True,
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .augment import AUGMENTED_NAME
+from .catalog import iter_dataset_images
+
+
+class ArrayLoader:
+    """
+    Zero-copy loading of warehouse images as memory-mapped uint8 arrays.
+
+    Each (split, label, angle) group is decoded once into
+    data_warehouse/arrays/<object_name>/<split>_<label>_<angle>.npy with a JSON
+    sidecar listing the source files and a fingerprint of their size and mtime.
+    Later loads memory map the .npy, so any number of training processes share the
+    same page-cached bytes. The array is rebuilt when files are added, removed or
+    changed.
+
+    :param object_name: Name of the object in the data warehouse.
+    :param catalog: Optional Catalog used to list the images instead of scanning.
+    :param image_size: (height, width) to resize to. If None, every image in a
+        group is brought to the resolution of the first one.
+    :param cache_dir: Array directory. Defaults to data_warehouse/arrays/<object_name>.
+
+    Example:
+        loader = ArrayLoader("apple", catalog=warehouse.catalog)
+        images, meta = loader.load("train", "good", "Front")
+    """
+
+    def __init__(
+        self,
+        object_name: str,
+        catalog=None,
+        image_size: Optional[Tuple[int, int]] = None,
+        cache_dir: Optional[str] = None,
+    ) -> None:
+        self.object_name = object_name.replace(" ", "_")
+        base_dir = os.path.join(os.getcwd(), "data_warehouse")
+        self.object_dir = os.path.join(base_dir, "dataset", self.object_name)
+        self.cache_dir = cache_dir or os.path.join(base_dir, "arrays", self.object_name)
+        self.catalog = catalog
+        self.image_size = tuple(image_size) if image_size else None
+
+    def list_files(self, provenance: Optional[str] = None) -> Dict[tuple, List[str]]:
+        """Return {(split, label, angle): [relative paths]} sorted by path."""
+        groups = {}
+        if self.catalog is not None:
+            for row in self.catalog.query(
+                object=self.object_name, provenance=provenance
+            ):
+                rel = row["path"].split("/", 1)[1]
+                if not os.path.exists(self.source_path(rel)):
+                    # Deleted since it was cataloged, leave it out of the array
+                    continue
+                key = (row["split"], row["label"], row["angle"])
+                groups.setdefault(key, []).append(rel)
+        else:
+            for record in iter_dataset_images(self.object_dir):
+                rel = record["path"].replace(os.sep, "/")
+                augmented = bool(AUGMENTED_NAME.search(rel))
+                if provenance is not None and augmented != (provenance == "augmented"):
+                    continue
+                key = (record["split"], record["label"], record["angle"])
+                groups.setdefault(key, []).append(rel)
+        return {key: sorted(paths) for key, paths in groups.items()}
+
+    def source_path(self, rel: str) -> str:
+        return os.path.join(self.object_dir, *rel.split("/"))
+
+    def fingerprint(self, paths: List[str]) -> str:
+        digest = hashlib.sha256()
+        digest.update(json.dumps(self.image_size).encode())
+        for rel in paths:
+            try:
+                stat = os.stat(self.source_path(rel))
+            except FileNotFoundError:
+                continue
+            digest.update(f"{rel}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    def group_name(self, split: str, label: str, angle: str, provenance=None) -> str:
+        name = f"{split}_{label}_{angle}"
+        return name if provenance is None else f"{name}_{provenance}"
+
+    def load(
+        self,
+        split: str,
+        label: str,
+        angle: str,
+        provenance: Optional[str] = None,
+    ) -> Tuple[np.ndarray, dict]:
+        """
+        Return a read-only (n, height, width, 3) memory map and its metadata.
+
+        The array is materialised first if it is missing or stale.
+
+        :raises KeyError: If the group has no images.
+        """
+        paths = self.list_files(provenance).get((split, label, angle))
+        if not paths:
+            raise KeyError(f"No images for {self.object_name} {split}/{label}/{angle}")
+        name = self.group_name(split, label, angle, provenance)
+        npy_path = os.path.join(self.cache_dir, name + ".npy")
+        meta_path = os.path.join(self.cache_dir, name + ".json")
+        fingerprint = self.fingerprint(paths)
+
+        meta = None
+        if os.path.exists(meta_path) and os.path.exists(npy_path):
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if meta.get("fingerprint") != fingerprint:
+                logging.info(f"Array {name} is stale, rebuilding")
+                meta = None
+
+        if meta is None:
+            meta = self.materialise(paths, npy_path, meta_path, fingerprint)
+        return np.load(npy_path, mmap_mode="r"), meta
+
+    def load_all(self, provenance: Optional[str] = None) -> Dict[tuple, np.ndarray]:
+        return {
+            key: self.load(*key, provenance=provenance)[0]
+            for key in self.list_files(provenance)
+        }
+
+    def materialise(
+        self, paths: List[str], npy_path: str, meta_path: str, fingerprint: str
+    ) -> dict:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        size = self.image_size
+        if size is None:
+            for rel in paths:
+                first = cv2.imread(self.source_path(rel))
+                if first is not None:
+                    size = first.shape[:2]
+                    break
+        height, width = size or (0, 0)
+
+        # Write to a private temporary file, then rename, so concurrent readers
+        # never see a partially written array
+        tmp_path = f"{npy_path}.{os.getpid()}.tmp"
+        array = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.uint8, shape=(len(paths), height, width, 3)
+        )
+        stored = []
+        for rel in paths:
+            img = cv2.imread(self.source_path(rel))
+            if img is None:
+                logging.error(f"Could not read {rel}, leaving it out of {npy_path}")
+                continue
+            if img.shape[:2] != (height, width):
+                img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+            array[len(stored)] = img
+            stored.append(rel)
+        if len(stored) < len(paths):
+            # Copy the readable images into an array of the right length
+            packed = np.lib.format.open_memmap(
+                f"{tmp_path}.packed",
+                mode="w+",
+                dtype=np.uint8,
+                shape=(len(stored), height, width, 3),
+            )
+            packed[:] = array[: len(stored)]
+            packed.flush()
+            del packed, array
+            os.replace(f"{tmp_path}.packed", tmp_path)
+        else:
+            array.flush()
+            del array
+        os.replace(tmp_path, npy_path)
+
+        meta = {
+            "fingerprint": fingerprint,
+            "shape": [len(stored), height, width, 3],
+            "paths": stored,
+        }
+        with open(f"{meta_path}.{os.getpid()}.tmp", "w") as f:
+            json.dump(meta, f, indent=4)
+        os.replace(f"{meta_path}.{os.getpid()}.tmp", meta_path)
+        print(f"Materialised {len(stored)} images into {npy_path}")
+        return meta
@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+
+from .camera import CameraManager
+
+
+class AsyncCameraManager:
+    """
+    asyncio interface to a CameraManager.
+
+    Devices are opened and read on one single-thread executor per camera, so each
+    device is only touched by one thread and the cameras read concurrently. PNG
+    encoding runs on a separate pool, so the next frame can be read while the last
+    one is written. Every await takes a timeout and can be cancelled. Several managers
+    can share one event loop to drive several rigs.
+
+    Triggers are asyncio.Event objects. Each capture set waits for the trigger to be
+    set and clears it again, so another task (a line controller, a status API
+    endpoint) sets the event once per set instead of the operator pressing Enter.
+
+    :param camera_manager: Configured CameraManager. Its allow_user_input is ignored.
+    :param timeout: Seconds before a camera read or save raises asyncio.TimeoutError.
+        None waits forever. A timeout cannot interrupt the driver call, so the device
+        stays busy until it returns. Until then further reads from that camera raise
+        asyncio.TimeoutError at once instead of queueing behind it.
+
+    Example:
+        async with AsyncCameraManager(CameraManager(warehouse)) as rig:
+            trigger = asyncio.Event()
+            task = asyncio.create_task(rig.run(trigger))
+            ...
+            trigger.set()  # capture the next set
+            await task
+    """
+
+    def __init__(
+        self, camera_manager: CameraManager, timeout: Optional[float] = 10.0
+    ) -> None:
+        self.manager = camera_manager
+        self.timeout = timeout
+        n_cameras = max(1, len(self.manager.camera_angles))
+        self.read_executors = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"mccp-camera-{i}")
+            for i in range(n_cameras)
+        ]
+        self.save_executor = ThreadPoolExecutor(
+            max_workers=n_cameras, thread_name_prefix="mccp-save"
+        )
+        # Device calls still running after a timeout or cancellation, by position
+        self.stuck: Dict[int, Future] = {}
+
+    async def __aenter__(self) -> "AsyncCameraManager":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the executors without waiting for running device calls."""
+        for executor in self.read_executors:
+            executor.shutdown(wait=False)
+        self.save_executor.shutdown(wait=False)
+
+    def _executor(self, cam_idx: int) -> ThreadPoolExecutor:
+        return self.read_executors[cam_idx % len(self.read_executors)]
+
+    async def _call(self, executor, func, *args, cam_idx: Optional[int] = None):
+        if cam_idx in self.stuck and not self.stuck[cam_idx].done():
+            raise asyncio.TimeoutError(
+                f"Camera {cam_idx} is still busy with a call that timed out"
+            )
+        call = executor.submit(func, *args)
+        # asyncio.wait instead of wait_for, which can swallow a cancellation that
+        # arrives while the executor call completes
+        future = asyncio.wrap_future(call)
+        try:
+            done, _ = await asyncio.wait({future}, timeout=self.timeout)
+        except asyncio.CancelledError:
+            self._abandon(call, cam_idx)
+            raise
+        if not done:
+            self._abandon(call, cam_idx)
+            raise asyncio.TimeoutError(f"{func.__name__} timed out")
+        return future.result()
+
+    def _abandon(self, call: Future, cam_idx: Optional[int]) -> None:
+        # cancel() only drops calls that have not started, a running device call
+        # keeps its thread until it returns
+        if not call.cancel() and cam_idx is not None:
+            self.stuck[cam_idx] = call
+
+    async def initialize_cameras(self) -> None:
+        """Open every configured camera on its own executor, all concurrently."""
+        self.manager.captures = list(
+            await asyncio.gather(
+                *(
+                    self._call(
+                        self._executor(cam_idx),
+                        self.manager.open_camera,
+                        camera,
+                        cam_idx=cam_idx,
+                    )
+                    for cam_idx, camera in enumerate(self.manager.camera_config)
+                )
+            )
+        )
+
+    async def read_frame(self, cam_idx: int, flush: int = 2):
+        """Read one frame from a camera, see CameraManager.read_frame."""
+        angle = self.manager.camera_angles[cam_idx]
+        return await self._call(
+            self._executor(cam_idx),
+            self.manager.read_frame,
+            cam_idx,
+            angle,
+            flush,
+            cam_idx=cam_idx,
+        )
+
+    async def capture_set(self, folder_path: str, image_counter: int) -> List[str]:
+        """
+        Capture one image from every configured camera.
+
+        All cameras are read concurrently, then all frames are saved concurrently.
+
+        :return: Paths of the saved images.
+        """
+        cameras = [
+            (cam_idx, angle)
+            for cam_idx, angle in enumerate(self.manager.camera_angles)
+            if angle is not None and angle != "skip"
+        ]
+        frames = await asyncio.gather(
+            *(self.read_frame(cam_idx) for cam_idx, _ in cameras)
+        )
+        filenames = await asyncio.gather(
+            *(
+                self._call(
+                    self.save_executor,
+                    self.manager.save_frame,
+                    folder_path,
+                    cam_idx,
+                    angle,
+                    image_counter,
+                    frame,
+                )
+                for (cam_idx, angle), frame in zip(cameras, frames)
+                if frame is not None
+            )
+        )
+        return [filename for filename in filenames if filename is not None]
+
+    async def capture_multiple_images(
+        self,
+        folder_path: str,
+        num_pictures_to_take: int,
+        trigger: Optional[asyncio.Event] = None,
+    ) -> List[str]:
+        """
+        Capture num_pictures_to_take sets, waiting for trigger before each one.
+
+        :param trigger: Event awaited and cleared before every set. If None, sets
+            are captured back to back.
+        """
+        filenames = []
+        for image_counter in range(num_pictures_to_take):
+            if trigger is not None:
+                await trigger.wait()
+                trigger.clear()
+            filenames.extend(await self.capture_set(folder_path, image_counter))
+        return filenames
+
+    async def run(self, trigger: Optional[asyncio.Event] = None) -> List[str]:
+        """
+        Async version of CameraManager.run.
+
+        Captures train/good, test/good and every anomaly folder of the warehouse.
+
+        :return: Paths of all saved images.
+        """
+        manager = self.manager
+        await self.initialize_cameras()
+        base_dir = os.path.join(
+            os.getcwd(), "data_warehouse", "dataset", manager.warehouse.object_name
+        )
+        stages = [
+            (os.path.join(base_dir, "train", "good"), manager.train_images),
+            (os.path.join(base_dir, "test", "good"), manager.test_anomaly_images),
+        ]
+        for anomaly in manager.warehouse.anomalies:
+            anomaly_folder = os.path.join(
+                base_dir, "test", manager.warehouse.clean_folder_name(anomaly)
+            )
+            stages.append((anomaly_folder, manager.test_anomaly_images))
+
+        filenames = []
+        for folder_path, count in stages:
+            if count == 0:
+                continue
+            logging.info(f"Capturing {count} sets into {folder_path}")
+            filenames.extend(
+                await self.capture_multiple_images(folder_path, count, trigger)
+            )
+        return filenames
+
+    async def frames(
+        self, cam_idx: int, max_frames: Optional[int] = None
+    ) -> AsyncIterator:
+        """
+        Stream frames from one camera until max_frames or until cancelled.
+
+        Frames are read back to back without flushing. A failed read ends the stream.
+        """
+        count = 0
+        while max_frames is None or count < max_frames:
+            frame = await self.read_frame(cam_idx, flush=0)
+            if frame is None:
+                return
+            count += 1
+            yield frame
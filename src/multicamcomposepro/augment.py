@@ -1,21 +1,165 @@
+import hashlib
+import json
 import logging
 import os
 import random
+import re
+from collections import OrderedDict
 
 import cv2
 import numpy as np
 
-from .utils import allowed_file
+from .distortion import RemapCache, radial_distortion_maps
+from .pipeline import AugmentationPipeline
+from .textures import TextureLibrary
+from .tiling import (
+    gaussian_blur_tiled,
+    remap_tiled,
+    rows_for_budget,
+    strip_ranges,
+)
+from .utils import allowed_file, file_sha256
+
+MANIFEST_NAME = "augmentation_manifest.json"
+
+AUGMENTED_NAME = re.compile(r"_aug_\d+\.png$")
+
+# Scratch buffers are kept for this many (shape, dtype, slot) combinations
+MAX_SCRATCH_BUFFERS = 32
+
+
+class AugmentationManifest:
+    """
+    Records which augmented files were produced from which source image.
+
+    Entries are keyed by the source path relative to the train/good directory and
+    store the source content hash, the hash of the augmentation settings and the
+    relative paths of the outputs. An entry is current when both hashes match and
+    all of its outputs still exist on disk.
+
+    :param path: Path to the manifest JSON file.
+    :param catalog: Optional Catalog kept in sync with recorded and removed outputs.
+    """
+
+    def __init__(self, path: str, catalog=None) -> None:
+        self.path = path
+        self.root = os.path.dirname(path)
+        self.catalog = catalog
+        self.entries: dict = {}
+        self.dirty = False
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.entries = json.load(f).get("entries", {})
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read manifest {self.path}: {e}")
+            self.entries = {}
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "entries": self.entries}, f, indent=4)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def is_current(self, source: str, source_hash: str, settings_hash: str) -> bool:
+        entry = self.entries.get(source)
+        if entry is None:
+            return False
+        if entry["source_hash"] != source_hash:
+            return False
+        if entry["settings_hash"] != settings_hash:
+            return False
+        return all(
+            os.path.exists(os.path.join(self.root, output))
+            for output in entry["outputs"]
+        )
+
+    def record(
+        self, source: str, source_hash: str, settings_hash: str, outputs
+    ) -> None:
+        self.entries[source] = {
+            "source_hash": source_hash,
+            "settings_hash": settings_hash,
+            "outputs": sorted(outputs),
+        }
+        self.dirty = True
+        if self.catalog is not None:
+            source_path = os.path.join(self.root, source)
+            self.catalog.add_many(
+                (os.path.join(self.root, output), None, None, "augmented", source_path)
+                for output in outputs
+            )
+
+    def pop(self, source: str) -> list:
+        entry = self.entries.pop(source, None)
+        if entry is None:
+            return []
+        self.dirty = True
+        return entry["outputs"]
+
+    def owned_outputs(self) -> set:
+        return {
+            output for entry in self.entries.values() for output in entry["outputs"]
+        }
+
+    def remove_outputs(self, outputs) -> None:
+        for output in outputs:
+            output_path = os.path.join(self.root, output)
+            if os.path.exists(output_path):
+                os.remove(output_path)
+                print(f"Removed {output}")
+            if self.catalog is not None:
+                self.catalog.remove(output_path)
 
 
 class DataAugmenter:
+    """
+    Create synthetic training images from the captured train/good images.
+
+    :param object_name: Name of the object in the data warehouse.
+    :param num_augmented_images: Number of augmented images per source image.
+    :param temperature: Strength of the augmentations.
+    :param logging_enabled: Log to ./data_augmentation.log.
+    :param seed: Optional seed. When set, each source image is augmented with a
+        random state derived from the seed and its path, so re-runs are reproducible.
+    :param pipeline: AugmentationPipeline, pipeline dict or path to a pipeline JSON
+        file. Defaults to the standard white balance to pixel dropout chain.
+    :param profiler: Optional PipelineProfiler that records time spent per op.
+    :param textures: TextureLibrary or texture directory used by the texture_overlay op.
+    :param grouped: Augment all angles of a capture (same filename) together, with
+        shared photometric parameters and one stacked batch per group.
+    :param catalog: Optional Catalog, e.g. Warehouse.catalog. Sources are then listed
+        from the catalog and augmented outputs are recorded in it.
+    :param tile_rows: Process white balance, lens distortion and blur in strips of
+        this many rows, so their temporaries stay small for very large images. The
+        output is identical to whole-frame processing.
+    :param memory_budget: Bytes for the temporaries of one tiled op. The strip
+        height is derived from it when tile_rows is not set.
+    """
+
     def __init__(
         self,
         object_name="object_name",
         num_augmented_images=3,
         temperature=1.0,
         logging_enabled=True,
+        seed=None,
+        pipeline=None,
+        profiler=None,
+        textures=None,
+        grouped=False,
+        catalog=None,
+        tile_rows=None,
+        memory_budget=None,
     ):
+        self.object_name = object_name.replace(" ", "_")
         self.object_dir = os.path.join(
             os.getcwd(),
             "data_warehouse",
@@ -26,8 +170,24 @@ class DataAugmenter:
         )
         self.num_augmented_images = num_augmented_images
         self.temperature = temperature
+        self.seed = seed
+        if isinstance(pipeline, str):
+            pipeline = AugmentationPipeline.from_json(pipeline)
+        elif isinstance(pipeline, dict):
+            pipeline = AugmentationPipeline.from_dict(pipeline)
+        self.pipeline = pipeline or AugmentationPipeline()
+        self.profiler = profiler
+        if isinstance(textures, str):
+            textures = TextureLibrary(textures)
+        self.textures = textures
+        self.grouped = grouped
+        self.remap_cache = RemapCache()
+        self.catalog = catalog
+        self.tile_rows = tile_rows
+        self.memory_budget = memory_budget
         self.resolution = None
         self.logging_enabled = logging_enabled
+        self._buffers = OrderedDict()
 
         if logging_enabled:
             logging.basicConfig(
@@ -36,114 +196,374 @@ class DataAugmenter:
                 format="%(asctime)s - %(levelname)s - %(message)s",
             )
 
+    def settings(self) -> dict:
+        """Augmentation settings that determine the output of process_image."""
+        return {
+            "temperature": self.temperature,
+            "count": self.num_augmented_images,
+            "seed": self.seed,
+            "ops": self.pipeline.to_dict()["ops"],
+            "textures": self.textures.names if self.textures else None,
+            "grouped": self.grouped,
+        }
+
+    def settings_hash(self) -> str:
+        encoded = json.dumps(self.settings(), sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def seed_source(self, source: str) -> None:
+        """Seed the random generators for one source image if a seed is set."""
+        if self.seed is None:
+            return
+        key = f"{self.seed}:{source}".encode()
+        derived = int.from_bytes(hashlib.sha256(key).digest()[:4], "little")
+        random.seed(derived)
+        np.random.seed(derived)
+
+    def scratch(self, shape, dtype, slot=0):
+        """
+        Return a preallocated buffer for shape and dtype, reused across calls.
+
+        Buffers are kept per (shape, dtype, slot) in a small LRU so that images of the
+        same resolution share memory across iterations and images.
+        """
+        key = (tuple(shape), np.dtype(dtype).str, slot)
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = np.empty(shape, dtype)
+            self._buffers[key] = buf
+            while len(self._buffers) > MAX_SCRATCH_BUFFERS:
+                self._buffers.popitem(last=False)
+        else:
+            self._buffers.move_to_end(key)
+        return buf
+
+    def tile_rows_for(self, img):
+        """Strip height for tiled ops on img, or None to process the whole frame."""
+        if self.tile_rows:
+            rows = self.tile_rows
+        elif self.memory_budget:
+            rows = rows_for_budget(img.shape[1], self.memory_budget)
+        else:
+            return None
+        return rows if rows < img.shape[0] else None
+
+    def release_buffers(self) -> None:
+        self._buffers.clear()
+
+    def swap_buffer(self, img, view=0):
+        """
+        Return the ping-pong scratch buffer for img that does not hold img.
+
+        :param view: Index of the view in a group, so views of the same shape
+            do not overwrite each other's buffers.
+        """
+        buf = self.scratch(img.shape, img.dtype, 2 * view)
+        if np.may_share_memory(buf, img):
+            return self.scratch(img.shape, img.dtype, 2 * view + 1)
+        return buf
+
     def process_image(self, img, filename, output_subdir):
+        """
+        Write num_augmented_images augmented versions of img to output_subdir.
+
+        :return: List of written output filenames.
+        """
         if not allowed_file(filename):
             logging.error(f"File type not allowed for {filename}")
-            return
+            return []
+
+        if img is None:
+            logging.error(f"Image is None for {filename}")
+            return []
 
         self.resolution = img.shape[
             :2
         ]  # Always sets resolution to the last image processed
         print(f"Resolution set to: {self.resolution}")
 
-        if img is None:
-            logging.error(f"Image is None for {filename}")
-            return
-
         print(filename)
+        outputs = []
         for i in range(self.num_augmented_images):
             logging.info(f"Augmenting {filename}. Iteration: {i}")
 
-            img, val = self.random_white_balance(img)
-            logging.info(f"Iter. {i}: {filename} - RGB vals: {val}")
-
-            img, val = self.random_exposure(img)
-            logging.info(f"Iter. {i}: {filename} - Exposure: {val}")
-
-            img, val = self.random_rotation(img)
-            logging.info(f"Iter. {i}: {filename} - Rotation: {val}")
-
-            # For mirroring. Too large of an augmentation for most objects.
-            # img, val = self.random_mirror(img)
-            # logging.info(f"Iter. {i}: {filename} - Mirrored: {val}")
-
-            img, val = self.random_lens_distortion(img, filename)
-            logging.info(f"Iter. {i}: {filename} - Perspect: {val}")
-
-            img, val = self.random_gaussian_blur(img)
-            logging.info(f"Iter. {i}: {filename} - Blur rad: {val}")
-
-            img = self.random_pixel_dropout(img)
+            # Every op writes into a reused scratch buffer of the same dtype
+            img, applied = self.pipeline.apply(self, img, filename, self.profiler)
+            for op_name, val in applied:
+                logging.info(f"Iter. {i}: {filename} - {op_name}: {val}")
 
             output_file = os.path.splitext(filename)[0] + f"_aug_{i}.png"
             output_path = os.path.join(output_subdir, output_file)
             cv2.imwrite(output_path, img)
+            outputs.append(output_file)
 
             if self.logging_enabled:
                 logging.info(f"Finished augmentation of {filename} as {output_file}")
                 print(f"Finished augmentation of {filename} as {output_file}")
 
-    def augment_images(self, selected_images=None):
+        return outputs
+
+    def augment_images(self, selected_images=None, force=False):
+        """
+        Augment the train/good images of every angle subdirectory.
+
+        Sources whose content and augmentation settings are unchanged since the last
+        run, according to the manifest, are skipped unless force is set.
+
+        :param selected_images: Only process these filenames in each subdirectory.
+        :param force: Reprocess sources even if the manifest says they are current.
+        """
         print("augment_images_running")
+        manifest = AugmentationManifest(
+            os.path.join(self.object_dir, MANIFEST_NAME), self.catalog
+        )
+        owned = manifest.owned_outputs()
+        settings_hash = self.settings_hash()
+        seen = set()
+        skipped = 0
+
+        # Sources processed together. In grouped mode all angles sharing a
+        # capture filename form one group, otherwise every source is its own.
+        groups = {}
+        for subdir, image_files in self.list_sources():
+            if selected_images:
+                image_files = selected_images
+
+            for img_file in image_files:
+                source = f"{subdir}/{img_file}"
+                if source in owned or AUGMENTED_NAME.search(img_file):
+                    continue  # Skip already augmented files to avoid aug_1_aug_2_aug_3 etc.
+                seen.add(source)
+                key = f"group:{img_file}" if self.grouped else source
+                groups.setdefault(key, []).append((subdir, img_file))
+
+        for key, members in groups.items():
+            hashes = {}
+            for subdir, img_file in members:
+                img_path = os.path.join(self.object_dir, subdir, img_file)
+                try:
+                    hashes[(subdir, img_file)] = file_sha256(img_path)
+                except OSError as e:
+                    logging.error(f"Could not hash {img_path}: {e}")
+            members = [member for member in members if member in hashes]
+
+            if not force and all(
+                manifest.is_current(
+                    f"{subdir}/{img_file}", hashes[(subdir, img_file)], settings_hash
+                )
+                for subdir, img_file in members
+            ):
+                logging.info(f"Skipping unchanged {key}")
+                skipped += len(members)
+                continue
+
+            images = []
+            for subdir, img_file in list(members):
+                logging.info(f"Processing {img_file} in {subdir}")
+                img_path = os.path.join(self.object_dir, subdir, img_file)
+                img = cv2.imread(img_path)
+                if img is None:
+                    logging.error(f"Could not read {img_path}")
+                    members.remove((subdir, img_file))
+                    continue
+                images.append(img)
+            if not images:
+                continue
+
+            self.seed_source(key)
+            subdir_paths = [os.path.join(self.object_dir, d) for d, _ in members]
+            filenames = [img_file for _, img_file in members]
+            if self.grouped:
+                group_outputs = self.process_group(images, filenames, subdir_paths)
+            else:
+                group_outputs = [
+                    self.process_image(images[0], filenames[0], subdir_paths[0])
+                ]
+
+            for (subdir, img_file), outputs in zip(members, group_outputs):
+                source = f"{subdir}/{img_file}"
+                outputs = [f"{subdir}/{output}" for output in outputs]
+                stale = set(manifest.pop(source)) - set(outputs)
+                manifest.remove_outputs(stale)
+                manifest.record(
+                    source, hashes[(subdir, img_file)], settings_hash, outputs
+                )
+            print("Image shape:", images[-1].shape)
+            print("Resolution:", self.resolution)
+
+        if selected_images is None:
+            # Sources that were deleted no longer justify their outputs. Sources
+            # that were only not listed, e.g. by a stale catalog, keep theirs.
+            for source in set(manifest.entries) - seen:
+                if not os.path.exists(os.path.join(self.object_dir, source)):
+                    manifest.remove_outputs(manifest.pop(source))
+
+        manifest.save()
+        print(f"Data augmentation complete. Skipped {skipped} unchanged images.")
+
+    def list_sources(self):
+        """
+        Return (angle subdirectory, filenames) pairs of train/good images.
+
+        Uses an indexed catalog query when a catalog is set, else lists directories.
+        A catalog without train/good originals for the object, e.g. one created
+        after the images were captured, is ignored in favour of the directories.
+        """
+        filters = dict(
+            object=self.object_name, split="train", label="good", provenance="original"
+        )
+        if self.catalog is not None and self.catalog.count(**filters):
+            listing = {}
+            for row in self.catalog.query(**filters):
+                listing.setdefault(row["angle"], []).append(row["filename"])
+            return sorted(listing.items())
+
         subdirs = [
             d
             for d in os.listdir(self.object_dir)
             if os.path.isdir(os.path.join(self.object_dir, d))
         ]
+        return [
+            (subdir, os.listdir(os.path.join(self.object_dir, subdir)))
+            for subdir in subdirs
+        ]
+
+    def process_group(self, images, filenames, output_subdirs):
+        """
+        Augment all views of one capture together.
 
-        for subdir in subdirs:
-            subdir_path = os.path.join(self.object_dir, subdir)
+        Views of equal shape are stacked into one reused batch buffer so the shared
+        photometric ops run once for the whole group. See AugmentationPipeline.apply_group.
 
-            image_files = (
-                selected_images if selected_images else os.listdir(subdir_path)
+        :param images: Decoded views, one per angle.
+        :param filenames: Filename of each view.
+        :param output_subdirs: Directory of each view.
+        :return: List of written output filenames per view.
+        """
+        group_name = ", ".join(
+            os.path.join(os.path.basename(d), f)
+            for d, f in zip(output_subdirs, filenames)
+        )
+        self.resolution = images[-1].shape[:2]
+
+        views = images
+        if len({(img.shape, img.dtype.str) for img in images}) == 1:
+            batch = self.scratch(
+                (len(images),) + images[0].shape, images[0].dtype, "batch"
             )
+            views = np.stack(images, out=batch)
 
-            for img_file in image_files:
-                if "_aug_" in img_file:
-                    continue  # Skip already augmented files to avoid aug_1_aug_2_aug_3 etc.
+        outputs = [[] for _ in images]
+        for i in range(self.num_augmented_images):
+            logging.info(f"Augmenting group {group_name}. Iteration: {i}")
+            views, applied = self.pipeline.apply_group(
+                self, views, group_name, self.profiler
+            )
+            for op_name, val in applied:
+                logging.info(f"Iter. {i}: {group_name} - {op_name}: {val}")
 
-                logging.info(f"Processing {img_file} in {subdir}")
-                img_path = os.path.join(subdir_path, img_file)
-                img = cv2.imread(img_path)
-                if img is None:
-                    logging.error(f"Could not read {img_path}")
-                    continue
+            for k, (filename, output_subdir) in enumerate(
+                zip(filenames, output_subdirs)
+            ):
+                output_file = os.path.splitext(filename)[0] + f"_aug_{i}.png"
+                cv2.imwrite(os.path.join(output_subdir, output_file), views[k])
+                outputs[k].append(output_file)
 
-                self.process_image(img, img_file, subdir_path)
-                print("Image shape:", img.shape)
-                print("Resolution:", self.resolution)
+            if self.logging_enabled:
+                logging.info(f"Finished augmentation iteration {i} of {group_name}")
+                print(f"Finished augmentation iteration {i} of {group_name}")
 
-        print("Data augmentation complete.")
+        return outputs
 
-    def random_crop(self, img):
-        # TODO
-        return img
+    def random_crop(self, img, dst=None, scale_range=None, resize=True):
+        """
+        Crop a random window covering a random fraction of each side of the image.
 
-    def random_white_balance(self, img):
-        # TODO: Set actual kelvin values (?)
-        b, g, r = cv2.split(img)
+        By default the window is scaled back to the input size into dst, so chained
+        iterations of process_image keep the source resolution. With resize=False
+        the crop is returned as a view of img, so no pixels are copied and the
+        following ops work on the smaller window.
 
-        factor = self.temperature * 0.02
+        Parameters:
+            img (np.array): The input image.
+            scale_range (tuple, optional): Range for the kept fraction of each side.
+                Derived from temperature if None.
+            resize (bool): Resize the crop back to the input resolution.
 
-        scale_r = random.uniform(0.98 + factor, 1.02)
-        scale_g = random.uniform(0.98 - factor, 1.02)
-        scale_b = random.uniform(0.98 - factor, 1.02)
+        Returns:
+            np.array, tuple: The cropped image and the (x, y, width, height) window.
+        """
+        if scale_range is None:
+            scale_range = (max(0.5, 1.0 - abs(self.temperature) * 0.1), 1.0)
+        scale = random.uniform(*scale_range)
 
-        balanced_r = cv2.convertScaleAbs(r, alpha=scale_r)
-        balanced_g = cv2.convertScaleAbs(g, alpha=scale_g)
-        balanced_b = cv2.convertScaleAbs(b, alpha=scale_b)
+        height, width = img.shape[:2]
+        crop_height = max(1, int(height * scale))
+        crop_width = max(1, int(width * scale))
+        y = random.randint(0, height - crop_height)
+        x = random.randint(0, width - crop_width)
+
+        cropped = img[y : y + crop_height, x : x + crop_width]
+        if resize:
+            cropped = cv2.resize(
+                cropped, (width, height), dst=dst, interpolation=cv2.INTER_LINEAR
+            )
+        return cropped, (x, y, crop_width, crop_height)
 
-        img = cv2.merge((balanced_b, balanced_g, balanced_r))
+    def draw_white_balance(self, scale_range=None):
+        """Draw the per-channel white balance scales as {"scales": (b, g, r)}."""
+        # TODO: Set actual kelvin values (?)
+        factor = self.temperature * 0.02
+
+        if scale_range is None:
+            scale_r = random.uniform(0.98 + factor, 1.02)
+            scale_g = random.uniform(0.98 - factor, 1.02)
+            scale_b = random.uniform(0.98 - factor, 1.02)
+        else:
+            scale_r, scale_g, scale_b = (random.uniform(*scale_range) for _ in range(3))
+        return {"scales": (scale_b, scale_g, scale_r)}
+
+    def random_white_balance(self, img, dst=None, scale_range=None, scales=None):
+        if scales is None:
+            scales = self.draw_white_balance(scale_range)["scales"]
+        scale_b, scale_g, scale_r = scales
+
+        rows = None if dst is None else self.tile_rows_for(img)
+        if rows is None:
+            img = self._balance(img, dst, scales)
+        else:
+            for y0, y1 in strip_ranges(img.shape[0], rows):
+                self._balance(img[y0:y1], dst[y0:y1], scales)
+            img = dst
 
         factor_str = f"R: {scale_r:.3f}, G: {scale_g:.3f}, B: {scale_b:.3f}"
 
         return img, factor_str
 
-    def random_exposure(self, img):
+    def _balance(self, img, dst, scales):
+        if dst is None:
+            b, g, r = cv2.split(img)
+        else:
+            planes = [self.scratch(img.shape[:2], img.dtype, f"c{c}") for c in range(3)]
+            b, g, r = cv2.split(img, planes)
+        scale_b, scale_g, scale_r = scales
+
+        # Saturating multiply in the image dtype, in place on the split planes
+        balanced_r = cv2.multiply(r, (scale_r,) * 4, dst=None if dst is None else r)
+        balanced_g = cv2.multiply(g, (scale_g,) * 4, dst=None if dst is None else g)
+        balanced_b = cv2.multiply(b, (scale_b,) * 4, dst=None if dst is None else b)
+
+        return cv2.merge((balanced_b, balanced_g, balanced_r), dst)
+
+    def draw_exposure(self, factor_range=None):
+        """Draw the exposure factor as {"factor": exposure_factor}."""
         # Higher temperature values overexposes, lower temperature values underexposes
         exposure_factor = 1.0
 
-        while (
+        if factor_range is not None:
+            exposure_factor = np.random.uniform(*factor_range)
+
+        while factor_range is None and (
             1 - (abs(self.temperature * 0.01))
             <= exposure_factor
             <= 1 + (abs(self.temperature * 0.04))
@@ -152,68 +572,166 @@ class DataAugmenter:
                 1.0 - (abs(self.temperature * 0.1)), 1.0
             ) + (self.temperature * 0.1)
 
-        img = img * exposure_factor
+        return {"factor": exposure_factor}
+
+    def random_exposure(self, img, dst=None, factor_range=None, factor=None):
+        exposure_factor = factor
+        if exposure_factor is None:
+            exposure_factor = self.draw_exposure(factor_range)["factor"]
+
+        # Saturating multiply keeps the image dtype instead of promoting to float64
+        img = cv2.multiply(img, (exposure_factor,) * 4, dst=dst)
 
         return img, exposure_factor
 
-    def random_rotation(self, img):
-        angle = random.uniform(-abs(self.temperature) + 1, abs(self.temperature) - 1)
-        angle = angle + (abs(self.temperature) % 3)
+    def random_rotation(self, img, dst=None, angle_range=None):
+        if angle_range is None:
+            angle = random.uniform(
+                -abs(self.temperature) + 1, abs(self.temperature) - 1
+            )
+            angle = angle + (abs(self.temperature) % 3)
+        else:
+            angle = random.uniform(*angle_range)
         rotation_matrix = cv2.getRotationMatrix2D(
             (img.shape[1] / 2, img.shape[0] / 2), angle, 1
         )
+        # Not tiled: warpAffine needs no full-size temporaries, and strips with a
+        # shifted matrix round differently in its fixed-point coordinates
         return (
             cv2.warpAffine(
-                img, rotation_matrix, img.shape[1::-1], flags=cv2.INTER_LINEAR
+                img,
+                rotation_matrix,
+                img.shape[1::-1],
+                dst=dst,
+                flags=cv2.INTER_LINEAR,
             ),
             angle,
         )
 
-    def random_lens_distortion(self, img, file_name):
-        min_distortion_factor = 0.99 - (abs(self.temperature)) * 0.02
-        max_distortion_factor = 1.01 + (abs(self.temperature)) * 0.02
+    def random_lens_distortion(
+        self,
+        img,
+        file_name=None,
+        dst=None,
+        k1_range=None,
+        k2_range=None,
+        factor_range=None,
+    ):
+        """
+        Apply a random radial (barrel or pincushion) lens distortion.
 
-        distortion_factor_x = np.random.uniform(
-            min_distortion_factor, max_distortion_factor
-        )
-        distortion_factor_y = np.random.uniform(
-            min_distortion_factor, max_distortion_factor
-        )
+        The remap tables come from the augmenter's RemapCache, which keeps one map
+        pair per resolution and quantised (k1, k2) bucket.
+
+        Parameters:
+            img (np.array): The input image.
+            k1_range (tuple, optional): Range for the r^2 coefficient.
+            k2_range (tuple, optional): Range for the r^4 coefficient.
+                Both are derived from temperature if None.
+            factor_range (tuple, optional): Deprecated scale range of the former
+                affine distortion, kept for older pipeline files. A factor f maps to
+                k1 = f - 1, the same displacement at the image corners, with k2 = 0.
+
+        Returns:
+            np.array, tuple: The distorted image and the quantised (k1, k2).
+        """
+        if factor_range is not None and k1_range is None:
+            k1_range = (factor_range[0] - 1.0, factor_range[1] - 1.0)
+            if k2_range is None:
+                k2_range = (0.0, 0.0)
+        if k1_range is None:
+            k1_range = (-abs(self.temperature) * 0.05, abs(self.temperature) * 0.05)
+        if k2_range is None:
+            k2_range = (-abs(self.temperature) * 0.01, abs(self.temperature) * 0.01)
+
+        k1 = np.random.uniform(*k1_range)
+        k2 = np.random.uniform(*k2_range)
 
         height, width = img.shape[:2]
+        rows = self.tile_rows_for(img)
+        if rows is not None:
+            # Build the maps per strip instead of caching whole-frame maps
+            k1, k2 = self.remap_cache.quantise(k1, k2)
+            distorted_img = remap_tiled(
+                img,
+                lambda y0, y1: radial_distortion_maps(height, width, k1, k2, y0, y1),
+                np.empty_like(img) if dst is None else dst,
+                rows,
+            )
+            return distorted_img, (k1, k2)
+
+        (map1, map2), coefficients = self.remap_cache.get(height, width, k1, k2)
 
-        # perspective transformation matrix
-        distortion_matrix = np.array(
-            [
-                [distortion_factor_x, 0, 0],
-                [0, distortion_factor_y, 0],
-            ],
-            dtype=np.float32,
+        distorted_img = cv2.remap(
+            img,
+            map1,
+            map2,
+            cv2.INTER_LINEAR,
+            dst=dst,
+            borderMode=cv2.BORDER_CONSTANT,
         )
 
-        distorted_img = cv2.warpAffine(img, distortion_matrix, (width, height))
+        return distorted_img, coefficients
 
-        return distorted_img, distortion_matrix
+    def mirror(self, img, dst=None):
+        """Flip horizontally. The pipeline's mirror op uses this, gated by its p."""
+        return cv2.flip(img, 1, dst), True
 
-    def random_mirror(self, img):
+    def random_mirror(self, img, dst=None):
         if np.random.rand() < 0.5:
-            return cv2.flip(img, 1), True
+            return self.mirror(img, dst)
         return img, False
 
-    def random_gaussian_blur(self, img):
-        blur_radius = random.uniform(0, 1.0)
-        return cv2.GaussianBlur(img, (0, 0), blur_radius), f"{blur_radius:.5f}"
+    def random_gaussian_blur(self, img, dst=None, sigma_range=(0, 1.0)):
+        blur_radius = random.uniform(*sigma_range)
+        rows = self.tile_rows_for(img)
+        if rows is not None:
+            img = gaussian_blur_tiled(
+                img,
+                blur_radius,
+                np.empty_like(img) if dst is None else dst,
+                rows,
+                scratch=lambda shape, dtype: self.scratch(shape, dtype, "tile"),
+            )
+            return img, f"{blur_radius:.5f}"
+        return (
+            cv2.GaussianBlur(img, (0, 0), blur_radius, dst=dst),
+            f"{blur_radius:.5f}",
+        )
 
-    def random_texture_overlay(self, img):
-        # TODO
-        return img
+    def random_texture_overlay(self, img, dst=None, alpha_range=None):
+        """
+        Blend a random texture from the texture library over the image.
+
+        Textures come from the in-memory TextureLibrary, already resized to the image
+        resolution, so the overlay itself is a single cv2.addWeighted.
+
+        Parameters:
+            img (np.array): The input image.
+            alpha_range (tuple, optional): Range for the texture weight.
+                Derived from temperature if None.
+
+        Returns:
+            np.array, float: The blended image and the texture weight.
+        """
+        if not self.textures:
+            return img, None
+        if alpha_range is None:
+            alpha_range = (0.0, min(0.5, abs(self.temperature) * 0.1))
+        alpha = random.uniform(*alpha_range)
+
+        texture = self.textures.random(img.shape[:2])
+        img = cv2.addWeighted(img, 1.0 - alpha, texture, alpha, 0.0, dst=dst)
+        return img, alpha
 
-    def random_pixel_dropout(self, img):
+    def random_pixel_dropout(self, img, rate=None):
         """
         Randomly sets a percentage of the image's pixels to black based on temperature.
+        The image is modified in place.
 
         Parameters:
             img (np.array): The input image.
+            rate (float, optional): Fraction of pixels to drop. Derived from temperature if None.
 
         Returns:
             np.array: The image with random pixels set to black.
@@ -223,56 +741,50 @@ class DataAugmenter:
         # For example, let's assume temperature ranges from 0 to 1.
         # You can adjust the range and logic as needed.
         dropout_percentage = (
-            self.temperature * 0.0001
+            self.temperature * 0.0001 if rate is None else rate
         )  # Here, 0.01 is the base dropout and we adjust it by temperature up to 11%.
 
         # Calculate the number of pixels to drop
         total_pixels = img.shape[0] * img.shape[1]
         num_pixels_to_drop = int(min(dropout_percentage * total_pixels, total_pixels))
 
-        # Create a mask of the same size as the image, filled with False
-        dropout_mask = np.full(img.shape[:2], False)
-
-        # Randomly select pixels to drop
-        dropout_coords = np.random.choice(
-            total_pixels, num_pixels_to_drop, replace=False
+        # Randomly select pixels to drop. Sampling only the dropped indices avoids
+        # a full-size mask and the full permutation of np.random.choice.
+        dropout_coords = np.array(
+            random.sample(range(total_pixels), num_pixels_to_drop), dtype=np.intp
         )
 
         # Convert the 1D indices to 2D coordinates
         dropout_coords_2d = np.unravel_index(dropout_coords, img.shape[:2])
 
-        # Set the chosen pixels to True in the mask
-        dropout_mask[dropout_coords_2d] = True
-
         # Set the chosen pixels to black in the image
-        img[dropout_mask] = [0, 0, 0]  # [R, G, B]
+        img[dropout_coords_2d] = 0
 
         return img
 
-        # Remove augmented images from the chosen dataset
-
-    def remove_augmented_files(object_name):
+    @staticmethod
+    def remove_augmented_files(object_name, catalog=None):
         """
-        Used to remove augmented files from the object_name subdirectory of the dataset directory
-        Example: remove_augmented_files('apple')
+        Used to remove augmented files from the object_name subdirectory of the dataset directory.
+        Only files recorded in the augmentation manifest are removed.
+        Example: DataAugmenter.remove_augmented_files('apple')
         :param: object_name: Name of the object to remove augmented files from
+        :param: catalog: Optional Catalog to remove the files from as well
         """
         object_dir = os.path.join(
-            os.getcwd(), "data_warehouse", "dataset", object_name, "train", "good"
+            os.getcwd(),
+            "data_warehouse",
+            "dataset",
+            object_name.replace(" ", "_"),
+            "train",
+            "good",
         )
-        subdirs = [
-            d
-            for d in os.listdir(object_dir)
-            if os.path.isdir(os.path.join(object_dir, d))
-        ]
-
-        for subdir in subdirs:
-            subdir_path = os.path.join(object_dir, subdir)
-            for filename in os.listdir(subdir_path):
-                if "aug" in filename:
-                    file_path = os.path.join(subdir_path, filename)
-                    os.remove(file_path)
-                    print(f"Removed {filename}")
+        manifest = AugmentationManifest(
+            os.path.join(object_dir, MANIFEST_NAME), catalog
+        )
+        for source in list(manifest.entries):
+            manifest.remove_outputs(manifest.pop(source))
+        manifest.save()
 
 
 if __name__ == "__main__":
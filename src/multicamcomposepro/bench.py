@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import tracemalloc
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .augment import DataAugmenter
+
+# Name -> (height, width)
+RESOLUTIONS = {
+    "400x400": (400, 400),
+    "640x480": (480, 640),
+    "1080p": (1080, 1920),
+    "4K": (2160, 3840),
+}
+
+BENCHMARK_OPS = (
+    "white_balance",
+    "exposure",
+    "rotation",
+    "lens_distortion",
+    "gaussian_blur",
+    "pixel_dropout",
+)
+
+
+def synthetic_image(height: int, width: int, seed: int = 0) -> np.ndarray:
+    """Smooth colour gradients with sensor-like noise, as uint8 BGR."""
+    rng = np.random.RandomState(seed)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[..., 0] = (x + 0 * y).astype(np.uint8)
+    img[..., 1] = (y + 0 * x).astype(np.uint8)
+    img[..., 2] = ((x + y) / 2).astype(np.uint8)
+    noise = rng.randint(-8, 9, img.shape).astype(np.int16)
+    return np.clip(img.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def measure(
+    fn: Callable[[], object], repeats: int = 3, nbytes: int = 0, images: int = 1
+) -> dict:
+    """
+    Time fn and record its peak traced memory.
+
+    The fastest of repeats runs is reported. Peak memory is measured with
+    tracemalloc on a separate run, which covers numpy and OpenCV output arrays.
+    """
+    fn()  # Warm up buffers and caches
+    times = []
+    for _ in range(repeats):
+        start = perf_counter()
+        fn()
+        times.append(perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(times)
+    return {
+        "seconds": seconds,
+        "images_per_s": images / seconds,
+        "mb_per_s": nbytes / 2**20 / seconds,
+        "peak_mb": peak / 2**20,
+    }
+
+
+def benchmark_ops(
+    augmenter: DataAugmenter, img: np.ndarray, repeats: int = 3
+) -> Dict[str, dict]:
+    results = {}
+    for op in BENCHMARK_OPS:
+        method = getattr(augmenter, f"random_{op}")
+        if op == "pixel_dropout":
+            work = img.copy()
+            results[op] = measure(lambda: method(work), repeats, img.nbytes)
+        else:
+            dst = augmenter.swap_buffer(img)
+            results[op] = measure(lambda: method(img, dst=dst), repeats, img.nbytes)
+    return results
+
+
+def benchmark_process_image(
+    augmenter: DataAugmenter, img: np.ndarray, output_dir: str, repeats: int = 3
+) -> dict:
+    n = augmenter.num_augmented_images
+    return measure(
+        lambda: augmenter.process_image(img, "bench.png", output_dir),
+        repeats,
+        img.nbytes * n,
+        images=n,
+    )
+
+
+def benchmark_augment_images(
+    augmenter: DataAugmenter,
+    img: np.ndarray,
+    object_dir: str,
+    n_images: int = 4,
+    repeats: int = 1,
+) -> dict:
+    """Time augment_images over n_images sources in two angle directories."""
+    for angle in ("Front", "Left"):
+        angle_dir = os.path.join(object_dir, angle)
+        os.makedirs(angle_dir, exist_ok=True)
+        for i in range(n_images // 2):
+            cv2.imwrite(os.path.join(angle_dir, f"{i:03d}.png"), img)
+    augmenter.object_dir = object_dir
+    n = n_images * augmenter.num_augmented_images
+    return measure(
+        lambda: augmenter.augment_images(force=True),
+        repeats,
+        img.nbytes * n,
+        images=n,
+    )
+
+
+def run_benchmarks(
+    resolutions: Optional[Dict[str, Tuple[int, int]]] = None,
+    repeats: int = 3,
+    include_augment: bool = True,
+) -> dict:
+    """
+    Benchmark every op, process_image and augment_images at each resolution.
+
+    :return: {"meta": {...}, "results": {"<resolution>/<benchmark>": metrics}}
+    """
+    resolutions = resolutions or RESOLUTIONS
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (height, width) in resolutions.items():
+            img = synthetic_image(height, width)
+            augmenter = DataAugmenter(logging_enabled=False, seed=0)
+            for op, metrics in benchmark_ops(augmenter, img, repeats).items():
+                results[f"{name}/{op}"] = metrics
+            results[f"{name}/process_image"] = benchmark_process_image(
+                augmenter, img, tmp, repeats
+            )
+            if include_augment:
+                object_dir = os.path.join(tmp, name)
+                results[f"{name}/augment_images"] = benchmark_augment_images(
+                    augmenter, img, object_dir
+                )
+            print(f"Benchmarked {name}")
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def save_baseline(results: dict, filename: str) -> None:
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=4)
+
+
+def load_baseline(filename: str) -> dict:
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.25) -> List[str]:
+    """
+    Compare results to a baseline.
+
+    :param tolerance: Allowed relative drop in throughput or growth in peak memory.
+    :return: One message per regression. Empty if nothing regressed.
+    """
+    regressions = []
+    for key, metrics in results["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        if metrics["images_per_s"] < base["images_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: {metrics['images_per_s']:.1f} images/s, "
+                f"baseline {base['images_per_s']:.1f}"
+            )
+        if metrics["peak_mb"] > base["peak_mb"] * (1 + tolerance) + 1:
+            regressions.append(
+                f"{key}: peak {metrics['peak_mb']:.1f} MB, "
+                f"baseline {base['peak_mb']:.1f} MB"
+            )
+    return regressions
+
+
+def format_results(results: dict) -> str:
+    lines = [f"{'benchmark':<32}{'images/s':>10}{'MB/s':>10}{'peak MB':>10}"]
+    for key, metrics in results["results"].items():
+        lines.append(
+            f"{key:<32}{metrics['images_per_s']:>10.1f}"
+            f"{metrics['mb_per_s']:>10.1f}{metrics['peak_mb']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark MCCP augmentation.")
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        choices=list(RESOLUTIONS),
+        default=list(RESOLUTIONS),
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--baseline", help="Baseline JSON to compare against.")
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--skip-augment", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        {name: RESOLUTIONS[name] for name in args.resolutions},
+        args.repeats,
+        include_augment=not args.skip_augment,
+    )
+    print(format_results(results))
+
+    if args.save:
+        save_baseline(results, args.save)
+        print(f"Saved results to {args.save}")
+
+    if args.baseline:
+        regressions = compare(results, load_baseline(args.baseline), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
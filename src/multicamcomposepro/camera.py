@@ -3,13 +3,16 @@ import logging
 import os
 from platform import system
 from time import sleep
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 import cv2
+import numpy as np
 
-from .utils import CameraConfigurator, Warehouse, wcap
+from .augment import AUGMENTED_NAME
+from .color import CCM_KEY, apply_ccm
+from .dedup import BKTree, phash
+from .utils import CameraConfigurator, Warehouse, allowed_file, wcap
 
-logging.basicConfig(level=logging.INFO)
 os_name = system()
 
 
@@ -20,6 +23,10 @@ class CameraManager:
     :param warehouse: Warehouse object with directory structure.
     :param test_anomaly_images: Number of test anomaly images to capture.
     :param train_images: Number of training images to capture.
+    :param dedup_threshold: If set, skip frames whose perceptual hash is within this
+        Hamming distance of an image already in the same angle folder.
+    :param on_capture_set: Optional callback called as on_capture_set(folder_path,
+        filenames) after every set of views, e.g. to queue it for augmentation.
 
     :raises: TODO Add exceptions.
 
@@ -29,40 +36,45 @@ class CameraManager:
     """
 
     def __init__(
-        self, warehouse: Warehouse, test_anomaly_images: int = 5, train_images: int = 10, allow_user_input: bool = True, overwrite_original: bool = True
+        self, warehouse: Warehouse, test_anomaly_images: int = 5, train_images: int = 10, allow_user_input: bool = True, overwrite_original: bool = True, dedup_threshold: Optional[int] = None, on_capture_set: Optional[Callable[[str, List[str]], None]] = None
     ) -> None:
         self.warehouse: Warehouse = warehouse
         self.test_anomaly_images: int = test_anomaly_images
         self.train_images: int = train_images
         self.allow_user_input: bool = allow_user_input
         self.overwrite_original: bool = overwrite_original
+        self.dedup_threshold: Optional[int] = dedup_threshold
+        self.dedup_trees: dict = {}
+        self.on_capture_set = on_capture_set
         self.captures: List = []
         self.load_camera_config()
         self.sort_camera_angles()
 
     def initialize_cameras(self) -> None:
-        self.captures = []
-        for camera in self.camera_config:
-            cam_idx = camera["Camera"]
-            print(f"Camera {cam_idx} initializing...")
-            cap = wcap(cam_idx)
-            if isinstance(
-                camera["Resolution"], str
-            ):  # if the resolution is a string with format "width x height"
-                cap.set(
-                    cv2.CAP_PROP_FRAME_WIDTH, int(camera["Resolution"].split(" x ")[0])
-                )
-                cap.set(
-                    cv2.CAP_PROP_FRAME_HEIGHT, int(camera["Resolution"].split(" x ")[1])
-                )
-            else:  # if the resolution is a touple / list with format [width, height]
-                cap.set(cv2.CAP_PROP_FRAME_WIDTH, camera["Resolution"][0])
-                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, camera["Resolution"][1])
-            cap.set(cv2.CAP_PROP_EXPOSURE, camera["Camera Exposure"])
+        self.captures = [self.open_camera(camera) for camera in self.camera_config]
+
+    def open_camera(self, camera: dict):
+        """Open and configure the device of one camera_config entry."""
+        cam_idx = camera["Camera"]
+        print(f"Camera {cam_idx} initializing...")
+        cap = wcap(cam_idx)
+        if isinstance(
+            camera["Resolution"], str
+        ):  # if the resolution is a string with format "width x height"
+            cap.set(
+                cv2.CAP_PROP_FRAME_WIDTH, int(camera["Resolution"].split(" x ")[0])
+            )
             cap.set(
-                cv2.CAP_PROP_WHITE_BALANCE_BLUE_U, camera["Camera Color Temperature"]
+                cv2.CAP_PROP_FRAME_HEIGHT, int(camera["Resolution"].split(" x ")[1])
             )
-            self.captures.append(cap)
+        else:  # if the resolution is a touple / list with format [width, height]
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, camera["Resolution"][0])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, camera["Resolution"][1])
+        cap.set(cv2.CAP_PROP_EXPOSURE, camera["Camera Exposure"])
+        cap.set(
+            cv2.CAP_PROP_WHITE_BALANCE_BLUE_U, camera["Camera Color Temperature"]
+        )
+        return cap
 
     def load_camera_config(self, filename: str = "camera_config.json") -> None:
         if os.path.exists(filename):
@@ -70,6 +82,13 @@ class CameraManager:
                 self.camera_config = json.load(f)
         else:
             logging.warning(f"{filename} not found! Using default camera settings.")
+            self.camera_config = []
+        # Keyed by device index, since QuickCapture reads devices directly
+        self.color_matrices = {
+            camera["Camera"]: np.array(camera[CCM_KEY], dtype=np.float32)
+            for camera in self.camera_config
+            if camera.get(CCM_KEY) is not None
+        }
 
     def sort_camera_angles(self) -> None:
         self.camera_angles = [camera["Angle"] for camera in self.camera_config]
@@ -106,8 +125,13 @@ class CameraManager:
                 input("Press Enter to continue capturing after adjusting the object...")
             else:
                 print("Continuing without user input...\nCapturing the object...")
+            filenames = []
             for cam_idx, angle in enumerate(self.camera_angles):
-                self.capture_single_image(folder_path, cam_idx, angle, image_counter)
+                filename = self.capture_single_image(folder_path, cam_idx, angle, image_counter)
+                if filename is not None:
+                    filenames.append(filename)
+            if self.on_capture_set is not None:
+                self.on_capture_set(folder_path, filenames)
             image_counter += 1
 
     def capture_training_and_test_images(self) -> None:
@@ -153,7 +177,7 @@ class CameraManager:
 
     def capture_single_image(
         self, folder_path: str, cam_idx: int, angle: str, image_counter: int
-    ) -> None:
+    ) -> Optional[str]:
         """
         Capture a single image from a specific camera angle.
 
@@ -165,6 +189,8 @@ class CameraManager:
         :param angle: Camera angle for capturing.
         :param image_counter: Counter for the image to be captured.
 
+        :return: Path of the saved image, or None if nothing was saved.
+
         :raises: TODO Add exceptions.
 
         Example:
@@ -173,14 +199,28 @@ class CameraManager:
         if angle is None or angle == "skip":
             return
 
-        angle_folder_path = os.path.join(folder_path, angle)
-        os.makedirs(angle_folder_path, exist_ok=True)
+        frame = self.read_frame(cam_idx, angle)
+        if frame is None:
+            return
+        return self.save_frame(folder_path, cam_idx, angle, image_counter, frame)
+
+    def read_frame(self, cam_idx: int, angle: Optional[str] = None, flush: int = 2):
+        """
+        Read a frame from a camera, flushing stale buffered frames first.
+
+        The camera's color-correction matrix, if any, is applied.
 
+        :param cam_idx: Index of the camera to use for capturing.
+        :param angle: Camera angle, only used in log messages.
+        :param flush: Number of buffered frames to discard first.
+
+        :return: BGR frame, or None if the camera could not be read.
+        """
         # Use the pre-initialized capture object, else use argument index
         cap = self.captures[cam_idx] if self.captures else wcap(cam_idx)
 
         # Flush the buffer
-        for _ in range(2):
+        for _ in range(flush):
             ret, _ = cap.read()
             if not ret:
                 logging.error(
@@ -195,7 +235,48 @@ class CameraManager:
                 f"Could not read frame from camera {cam_idx} at angle {angle}."
             )
             return
-        
+
+        matrix = self.color_matrices.get(self.device_index(cam_idx))
+        if matrix is not None:
+            frame = apply_ccm(frame, matrix)
+        return frame
+
+    def device_index(self, cam_idx: int) -> int:
+        """
+        Device index of a camera. With initialized captures cam_idx is a position
+        in camera_config, otherwise it already is the device index.
+        """
+        if self.captures and cam_idx < len(self.camera_config):
+            return self.camera_config[cam_idx]["Camera"]
+        return cam_idx
+
+    def save_frame(
+        self, folder_path: str, cam_idx: int, angle: str, image_counter: int, frame
+    ) -> Optional[str]:
+        """
+        Encode a frame into folder_path/angle and add it to the catalog.
+
+        :return: Path of the saved image, or None if it was skipped as a near-duplicate.
+        """
+        angle_folder_path = os.path.join(folder_path, angle)
+        os.makedirs(angle_folder_path, exist_ok=True)
+
+        frame_hash = None
+        if self.dedup_threshold is not None:
+            frame_hash = phash(frame)
+            tree = self.dedup_tree(angle_folder_path)
+            if tree.search(frame_hash, self.dedup_threshold):
+                logging.info(
+                    f"Skipped near-duplicate frame from camera {cam_idx} at angle {angle}."
+                )
+                if self.overwrite_original:
+                    # A frame from an earlier session at this index is now stale
+                    stale = os.path.join(angle_folder_path, f"{image_counter:03d}.png")
+                    if os.path.exists(stale):
+                        os.remove(stale)
+                        self.forget_capture(stale)
+                        logging.info(f"Removed stale image {stale}")
+                return
 
         if self.overwrite_original:
             filename = os.path.join(angle_folder_path, f"{image_counter:03d}.png")
@@ -210,9 +291,47 @@ class CameraManager:
                 if not os.path.exists(potential_filename):
                     cv2.imwrite(potential_filename, frame)
                     logging.info(f"Saved image {potential_filename}")
+                    filename = potential_filename
                     break
                 i += 1
 
+        self.record_capture(filename, frame)
+        if frame_hash is not None:
+            tree.add(frame_hash, filename)
+        return filename
+
+    def dedup_tree(self, angle_folder_path: str) -> BKTree:
+        """
+        Return the BK-tree of perceptual hashes for an angle folder.
+
+        The tree is built on first use. Existing images are only hashed when
+        overwrite_original is False, since otherwise they are about to be replaced.
+        """
+        tree = self.dedup_trees.get(angle_folder_path)
+        if tree is None:
+            tree = self.dedup_trees[angle_folder_path] = BKTree()
+            if not self.overwrite_original:
+                for name in sorted(os.listdir(angle_folder_path)):
+                    if not allowed_file(name) or AUGMENTED_NAME.search(name):
+                        continue
+                    path = os.path.join(angle_folder_path, name)
+                    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+                    if img is not None:
+                        tree.add(phash(img), path)
+        return tree
+
+    def record_capture(self, filename: str, frame) -> None:
+        """Add a saved capture to the warehouse catalog, if there is a warehouse."""
+        catalog = getattr(self.warehouse, "catalog", None)
+        if catalog is not None:
+            catalog.add(filename, frame.shape[1], frame.shape[0])
+
+    def forget_capture(self, filename: str) -> None:
+        """Remove a deleted capture from the warehouse catalog, if there is a warehouse."""
+        catalog = getattr(self.warehouse, "catalog", None)
+        if catalog is not None:
+            catalog.remove(filename)
+
                 
     def run(self) -> None:
         """
@@ -245,14 +364,6 @@ class CameraManager:
         print("Done.")
 
 
-if __name__ == "__main__":
-    warehouse = Warehouse()
-    warehouse.build("train_image_test", ["anomaly_1", "anomaly_2"])
-
-    CameraConfigurator()
-    camera_manager = CameraManager(warehouse, test_anomaly_images=5, train_images=10)
-    camera_manager.run()
-
 class QuickCapture(CameraManager):
     """Instantly capture images from all connected cameras
     Args:
@@ -261,9 +372,10 @@ class QuickCapture(CameraManager):
         n_cameras (int, optional): Defaults to 5.
     """
     def __init__(self, folder_path: Optional[str] = None, folder_name: str = "MCCP_QC", n_cameras: int = 5) -> None:
-        super().__init__(allow_user_input = False, warehouse=None)
+        super().__init__(warehouse=None, allow_user_input=False, overwrite_original=False)
 
         self.n_cameras = n_cameras
+        self.folder_name = folder_name
         if folder_path is None:
             self.folder_path = os.getcwd()
         else:
@@ -273,6 +385,14 @@ class QuickCapture(CameraManager):
 
     def capture(self) -> None:
         for i in range(self.n_cameras):
-            self.capture_single_image(folder_path=self.folder_path, cam_idx=i, angle="MCCP_QC", image_counter=1, overwrite_original=False)
+            self.capture_single_image(folder_path=self.folder_path, cam_idx=i, angle=self.folder_name, image_counter=1)
+
 
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    warehouse = Warehouse()
+    warehouse.build("train_image_test", ["anomaly_1", "anomaly_2"])
 
+    CameraConfigurator()
+    camera_manager = CameraManager(warehouse, test_anomaly_images=5, train_images=10)
+    camera_manager.run()
@@ -0,0 +1,306 @@
+import logging
+import os
+import sqlite3
+import threading
+from typing import Iterator, List, Optional
+
+from PIL import Image
+
+from .utils import allowed_file
+
+CATALOG_NAME = "catalog.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    object TEXT NOT NULL,
+    split TEXT NOT NULL,
+    label TEXT NOT NULL,
+    angle TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    provenance TEXT NOT NULL DEFAULT 'original',
+    source TEXT,
+    size INTEGER,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS images_group
+    ON images (object, split, label, angle);
+CREATE INDEX IF NOT EXISTS images_provenance
+    ON images (object, provenance);
+"""
+
+FILTERS = ("object", "split", "label", "angle", "provenance", "source")
+
+
+def iter_dataset_images(object_dir: str) -> Iterator[dict]:
+    """
+    Yield one record per image in a warehouse object directory.
+
+    Walks train/good/<angle> and test/<label>/<angle> in sorted order.
+    """
+    for split in ("train", "test"):
+        split_dir = os.path.join(object_dir, split)
+        if not os.path.isdir(split_dir):
+            continue
+        for label in sorted(os.listdir(split_dir)):
+            label_dir = os.path.join(split_dir, label)
+            if not os.path.isdir(label_dir):
+                continue
+            for angle in sorted(os.listdir(label_dir)):
+                angle_dir = os.path.join(label_dir, angle)
+                if not os.path.isdir(angle_dir):
+                    continue
+                for filename in sorted(os.listdir(angle_dir)):
+                    if not allowed_file(filename):
+                        continue
+                    path = os.path.join(angle_dir, filename)
+                    stat = os.stat(path)
+                    yield {
+                        "split": split,
+                        "label": label,
+                        "angle": angle,
+                        "path": os.path.relpath(path, object_dir),
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime,
+                    }
+
+
+class Catalog:
+    """
+    SQLite index of every image in data_warehouse/dataset.
+
+    Rows record object, split, label, angle, resolution and provenance
+    ('original' or 'augmented' with its source), so listing, filtering and counting
+    are indexed queries instead of directory scans. Capture and augmentation add rows
+    as they write files; verify() and rebuild() reconcile the catalog with disk.
+
+    :param path: Path to the SQLite file. Defaults to data_warehouse/catalog.sqlite.
+
+    Example:
+        catalog = Catalog()
+        catalog.count(object="apple", split="train", provenance="original")
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        if path is None:
+            path = os.path.join(os.getcwd(), "data_warehouse", CATALOG_NAME)
+        self.path = path
+        self.dataset_dir = os.path.join(os.path.dirname(path), "dataset")
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.dataset_dir).replace(
+            os.sep, "/"
+        )
+
+    def absolute(self, path: str) -> str:
+        return os.path.join(self.dataset_dir, *path.split("/"))
+
+    def _row(self, path, width=None, height=None, provenance="original", source=None):
+        rel = self.relative(path)
+        parts = rel.split("/")
+        if len(parts) != 5 or parts[0] == "..":
+            raise ValueError(f"{path} is not an image in {self.dataset_dir}")
+        abs_path = self.absolute(rel)
+        stat = os.stat(abs_path)
+        if width is None or height is None:
+            with Image.open(abs_path) as img:
+                width, height = img.size
+        if source is not None:
+            source = self.relative(source)
+        return (
+            rel,
+            *parts,
+            width,
+            height,
+            provenance,
+            source,
+            stat.st_size,
+            stat.st_mtime,
+        )
+
+    def add(self, path, width=None, height=None, provenance="original", source=None):
+        """
+        Add or update the row for an image file.
+
+        :param path: Absolute path, or path relative to the working directory.
+        :param width: Image width. Read from the file header if None.
+        :param height: Image height. Read from the file header if None.
+        :param provenance: 'original' or 'augmented'.
+        :param source: Path of the original an augmented image was made from.
+        """
+        self.add_many([(path, width, height, provenance, source)])
+
+    def add_many(self, items) -> None:
+        """Add (path, width, height, provenance, source) tuples in one transaction."""
+        rows = []
+        for item in items:
+            try:
+                rows.append(self._row(*item))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Not cataloged: {e}")
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def remove(self, path: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM images WHERE path = ?", (self.relative(path),)
+            )
+
+    def _where(self, filters: dict):
+        clauses, values = [], []
+        for key, value in filters.items():
+            if key not in FILTERS:
+                raise ValueError(f"Unknown catalog filter '{key}'")
+            if value is not None:
+                clauses.append(f"{key} = ?")
+                values.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), values
+
+    def query(self, **filters) -> List[dict]:
+        """Return matching rows as dicts, ordered by path."""
+        where, values = self._where(filters)
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT * FROM images{where} ORDER BY path", values
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def paths(self, **filters) -> List[str]:
+        """Return absolute paths of matching images."""
+        return [self.absolute(row["path"]) for row in self.query(**filters)]
+
+    def paths_under(self, directory: str, **filters) -> List[str]:
+        """
+        Return absolute paths of matching images below directory.
+
+        The directory is translated into object, split, label and angle filters, so
+        the lookup uses the group index instead of filtering every row.
+        """
+        rel = self.relative(directory)
+        if rel == ".":
+            return self.paths(**filters)
+        parts = rel.split("/")
+        if parts[0] == ".." or len(parts) > 4:
+            return []
+        filters.update(zip(("object", "split", "label", "angle"), parts))
+        return self.paths(**filters)
+
+    def count(self, **filters) -> int:
+        where, values = self._where(filters)
+        with self.lock:
+            return self.connection.execute(
+                f"SELECT COUNT(*) FROM images{where}", values
+            ).fetchone()[0]
+
+    def counts(self, object: Optional[str] = None) -> List[dict]:
+        """Image counts per object, split, label, angle and provenance."""
+        where, values = self._where({"object": object})
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT object, split, label, angle, provenance, COUNT(*) AS n "
+                f"FROM images{where} GROUP BY object, split, label, angle, provenance",
+                values,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _scan(self) -> dict:
+        found = {}
+        if not os.path.isdir(self.dataset_dir):
+            return found
+        for object_name in sorted(os.listdir(self.dataset_dir)):
+            object_dir = os.path.join(self.dataset_dir, object_name)
+            if not os.path.isdir(object_dir):
+                continue
+            for record in iter_dataset_images(object_dir):
+                rel = f"{object_name}/" + record["path"].replace(os.sep, "/")
+                found[rel] = record
+        return found
+
+    def verify(self) -> dict:
+        """
+        Compare the catalog with the files on disk.
+
+        :return: {"missing": [...], "untracked": [...], "changed": [...]} with
+            relative paths of rows without a file, files without a row and files
+            whose size or mtime differ from their row.
+        """
+        on_disk = self._scan()
+        with self.lock:
+            rows = {
+                row["path"]: (row["size"], row["mtime"])
+                for row in self.connection.execute(
+                    "SELECT path, size, mtime FROM images"
+                )
+            }
+        return {
+            "missing": sorted(set(rows) - set(on_disk)),
+            "untracked": sorted(set(on_disk) - set(rows)),
+            "changed": sorted(
+                path
+                for path in set(rows) & set(on_disk)
+                if rows[path] != (on_disk[path]["size"], on_disk[path]["mtime"])
+            ),
+        }
+
+    def sync(self) -> "Catalog":
+        """
+        Rebuild the catalog if verify() finds drift from disk, e.g. images captured
+        before the catalog existed or changed outside mccp.
+
+        :return: The catalog, so entry points can write Warehouse().catalog.sync().
+        """
+        report = self.verify()
+        if any(report.values()):
+            logging.info(
+                f"Catalog is out of date ({len(report['missing'])} missing, "
+                f"{len(report['untracked'])} untracked, {len(report['changed'])} "
+                "changed), rebuilding"
+            )
+            self.rebuild()
+        return self
+
+    def rebuild(self) -> int:
+        """
+        Recreate the catalog from disk.
+
+        Provenance comes from each object's augmentation manifest.
+
+        :return: Number of cataloged images.
+        """
+        from .augment import MANIFEST_NAME, AugmentationManifest
+
+        items = []
+        sources = {}
+        for rel in self._scan():
+            object_name = rel.split("/", 1)[0]
+            if object_name not in sources:
+                good_dir = os.path.join(self.dataset_dir, object_name, "train", "good")
+                manifest = AugmentationManifest(os.path.join(good_dir, MANIFEST_NAME))
+                sources[object_name] = {
+                    output: os.path.join(good_dir, source)
+                    for source, entry in manifest.entries.items()
+                    for output in entry["outputs"]
+                }
+            good_rel = rel.split("/", 3)[-1] if "/train/good/" in rel else None
+            source = sources[object_name].get(good_rel)
+            provenance = "original" if source is None else "augmented"
+            items.append((self.absolute(rel), None, None, provenance, source))
+
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM images")
+        self.add_many(items)
+        return len(items)
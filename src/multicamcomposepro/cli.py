@@ -0,0 +1,331 @@
+"""
+Command line interface, installed as the mccp command.
+
+Only the standard library is imported at module level. OpenCV, NumPy, PIL and tqdm
+are imported inside the subcommand that needs them, so mccp --help starts quickly.
+
+Examples:
+    mccp configure --yes --camera 0:Front:640x480 --camera 1:Left
+    mccp calibrate 0 --box 40 30 560 380
+    mccp capture apple --anomalies scratch dent --train 200 --test 50 --no-input
+    mccp augment apple --count 5 --seed 1
+    mccp resize data_warehouse/dataset resized --size 224 224 --workers 4
+    mccp stats apple
+    mccp bench --resolutions 640x480 --repeats 1
+"""
+
+import argparse
+import logging
+from typing import List, Optional
+
+
+def parse_camera(value: str) -> tuple:
+    """Parse INDEX:ANGLE[:WIDTHxHEIGHT[:EXPOSURE[:COLOR_TEMPERATURE]]]."""
+    parts = value.split(":")
+    if len(parts) < 2 or len(parts) > 5:
+        raise argparse.ArgumentTypeError(
+            f"Invalid camera '{value}', expected "
+            "INDEX:ANGLE[:WIDTHxHEIGHT[:EXPOSURE[:COLOR_TEMPERATURE]]]"
+        )
+    try:
+        settings = {"angle": parts[1]}
+        if len(parts) > 2:
+            width, height = parts[2].lower().split("x")
+            settings["resolution"] = f"{int(width)} x {int(height)}"
+        if len(parts) > 3:
+            settings["exposure"] = int(parts[3])
+        if len(parts) > 4:
+            settings["color_temp"] = int(parts[4])
+        return int(parts[0]), settings
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid camera '{value}'")
+
+
+def configure(args) -> int:
+    from .utils import CameraConfigurator
+
+    cameras = dict(args.camera) if args.camera else None
+    CameraConfigurator(args.n_cameras, reconfigure=args.yes or None, cameras=cameras)
+    return 0
+
+
+def calibrate(args) -> int:
+    import cv2
+
+    from .color import calibrate as estimate, save_ccm
+    from .utils import wcap
+
+    if args.image:
+        frame = cv2.imread(args.image, cv2.IMREAD_COLOR)
+        if frame is None:
+            raise SystemExit(f"Could not read {args.image}")
+    else:
+        cap = wcap(args.camera)
+        for _ in range(3):  # Flush the buffer
+            ret, frame = cap.read()
+        cap.release()
+        if not ret:
+            raise SystemExit(f"Could not read frame from camera {args.camera}")
+    matrix = estimate(frame, tuple(args.box) if args.box else None)
+    print(matrix.round(4))
+    save_ccm(args.camera, matrix, args.config)
+    return 0
+
+
+def megabytes(value: Optional[float]) -> Optional[int]:
+    return None if value is None else int(value * 2**20)
+
+
+def capture(args) -> int:
+    from .camera import CameraManager
+    from .utils import Warehouse
+
+    warehouse = Warehouse()
+    warehouse.build(args.object_name, args.anomalies)
+    print(warehouse)
+    camera_manager = CameraManager(
+        warehouse,
+        test_anomaly_images=args.test,
+        train_images=args.train,
+        allow_user_input=not args.no_input,
+        overwrite_original=not args.keep_existing,
+        dedup_threshold=args.dedup_threshold,
+    )
+    if args.augment is None:
+        camera_manager.run()
+        return 0
+
+    from .augment import DataAugmenter
+    from .session import PipelinedSession
+
+    augmenter = DataAugmenter(
+        args.object_name,
+        num_augmented_images=args.augment,
+        logging_enabled=False,
+        catalog=warehouse.catalog.sync(),
+    )
+    report = PipelinedSession(camera_manager, augmenter, args.max_pending).run()
+    return 1 if report["failed"] else 0
+
+
+def quick(args) -> int:
+    from .camera import QuickCapture
+
+    QuickCapture(args.folder_path, args.folder_name, args.n_cameras)
+    return 0
+
+
+def augment(args) -> int:
+    from .augment import DataAugmenter
+    from .utils import Warehouse
+
+    catalog = Warehouse().catalog.sync()
+    if args.remove:
+        DataAugmenter.remove_augmented_files(args.object_name, catalog=catalog)
+        return 0
+    augmenter = DataAugmenter(
+        args.object_name,
+        catalog=catalog,
+        num_augmented_images=args.count,
+        temperature=args.temperature,
+        logging_enabled=args.verbose,
+        seed=args.seed,
+        pipeline=args.pipeline,
+        textures=args.textures,
+        grouped=args.grouped,
+        tile_rows=args.tile_rows,
+        memory_budget=megabytes(args.memory_budget),
+    )
+    augmenter.augment_images(force=args.force)
+    return 0
+
+
+def resize(args) -> int:
+    from .utils import batch_resize
+
+    pyramid = None
+    if args.pyramid:
+        from .pyramid import PyramidCache
+
+        pyramid = PyramidCache()
+    batch_resize(
+        args.input_dir,
+        args.output_dir,
+        tuple(args.size),
+        overwrite_original=args.overwrite,
+        workers=args.workers,
+        pyramid=pyramid,
+        memory_budget=megabytes(args.memory_budget),
+    )
+    return 0
+
+
+def stats(args) -> int:
+    from .stats import DatasetStatistics
+
+    summary = DatasetStatistics(args.object_name, workers=args.workers).update()
+    for level in ("splits", "labels", "angles"):
+        for name, group in summary[level].items():
+            mean = ", ".join(f"{value:.1f}" for value in group["mean"])
+            std = ", ".join(f"{value:.1f}" for value in group["std"])
+            print(
+                f"{level[:-1]:<6} {name:<20} {group['images']:>6} images  "
+                f"mean (B, G, R) {mean}  std {std}"
+            )
+    return 0
+
+
+def bench(args) -> int:
+    from .bench import main as bench_main
+
+    return bench_main(args.bench_args)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="mccp", description="MultiCamComposePro: capture and prepare datasets."
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Debug logging.")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+
+    sub = subparsers.add_parser("configure", help="Write camera_config.json.")
+    sub.add_argument("--n-cameras", type=int, default=10)
+    sub.add_argument(
+        "--yes",
+        action="store_true",
+        help="Overwrite an existing config without asking.",
+    )
+    sub.add_argument(
+        "--camera",
+        action="append",
+        type=parse_camera,
+        metavar="INDEX:ANGLE[:WxH[:EXPOSURE[:TEMP]]]",
+        help="Configure a camera without opening a preview. Repeat per camera.",
+    )
+    sub.set_defaults(func=configure)
+
+    sub = subparsers.add_parser(
+        "calibrate", help="Estimate a color-correction matrix from a ColorChecker."
+    )
+    sub.add_argument("camera", type=int, help="Camera index in camera_config.json.")
+    sub.add_argument("--image", help="Use a saved frame instead of capturing one.")
+    sub.add_argument(
+        "--box",
+        type=int,
+        nargs=4,
+        metavar=("X", "Y", "WIDTH", "HEIGHT"),
+        help="Patch grid of the chart. Defaults to the whole frame.",
+    )
+    sub.add_argument("--config", default="camera_config.json")
+    sub.set_defaults(func=calibrate)
+
+    sub = subparsers.add_parser("capture", help="Capture train and test images.")
+    sub.add_argument("object_name")
+    sub.add_argument("--anomalies", nargs="*", default=[])
+    sub.add_argument("--train", type=int, default=10)
+    sub.add_argument("--test", type=int, default=5)
+    sub.add_argument(
+        "--no-input",
+        action="store_true",
+        help="Do not wait for Enter between captures.",
+    )
+    sub.add_argument(
+        "--keep-existing",
+        action="store_true",
+        help="Do not overwrite earlier captures.",
+    )
+    sub.add_argument("--dedup-threshold", type=int, default=None)
+    sub.add_argument(
+        "--augment",
+        type=int,
+        default=None,
+        metavar="COUNT",
+        help="Augment each train set COUNT times in the background while capturing.",
+    )
+    sub.add_argument(
+        "--max-pending",
+        type=int,
+        default=2,
+        help="Train sets that may wait for augmentation before capture blocks.",
+    )
+    sub.set_defaults(func=capture)
+
+    sub = subparsers.add_parser("quick", help="Capture one image from every camera.")
+    sub.add_argument("--folder-path", default=None)
+    sub.add_argument("--folder-name", default="MCCP_QC")
+    sub.add_argument("--n-cameras", type=int, default=5)
+    sub.set_defaults(func=quick)
+
+    sub = subparsers.add_parser("augment", help="Augment train/good images.")
+    sub.add_argument("object_name")
+    sub.add_argument("--count", type=int, default=3)
+    sub.add_argument("--temperature", type=float, default=1.0)
+    sub.add_argument("--seed", type=int, default=None)
+    sub.add_argument("--pipeline", default=None, help="Pipeline JSON file.")
+    sub.add_argument("--textures", default=None, help="Texture directory.")
+    sub.add_argument("--grouped", action="store_true")
+    sub.add_argument("--force", action="store_true", help="Redo up-to-date sources.")
+    sub.add_argument(
+        "--tile-rows", type=int, default=None, help="Process large images in strips."
+    )
+    sub.add_argument(
+        "--memory-budget",
+        type=float,
+        default=None,
+        metavar="MB",
+        help="Memory for the temporaries of one tiled op.",
+    )
+    sub.add_argument(
+        "--remove", action="store_true", help="Remove augmented files instead."
+    )
+    sub.set_defaults(func=augment)
+
+    sub = subparsers.add_parser("resize", help="Centre crop and resize a directory.")
+    sub.add_argument("input_dir")
+    sub.add_argument("output_dir")
+    sub.add_argument(
+        "--size", type=int, nargs=2, default=[224, 224], metavar=("WIDTH", "HEIGHT")
+    )
+    sub.add_argument("--workers", type=int, default=1, help="0 uses all CPUs.")
+    sub.add_argument("--overwrite", action="store_true")
+    sub.add_argument(
+        "--pyramid", action="store_true", help="Resize from the pyramid cache."
+    )
+    sub.add_argument(
+        "--memory-budget",
+        type=float,
+        default=None,
+        metavar="MB",
+        help="Memory for all workers. Defaults to the available memory.",
+    )
+    sub.set_defaults(func=resize)
+
+    sub = subparsers.add_parser("stats", help="Update dataset statistics.")
+    sub.add_argument("object_name")
+    sub.add_argument("--workers", type=int, default=1, help="0 uses all CPUs.")
+    sub.set_defaults(func=stats)
+
+    sub = subparsers.add_parser(
+        "bench", help="Benchmark augmentation. Options are passed to bench.main."
+    )
+    sub.set_defaults(func=bench, passthrough=True)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    # Options of bench are declared by bench.main, so they are passed through
+    args, extras = parser.parse_known_args(argv)
+    if getattr(args, "passthrough", False):
+        args.bench_args = [arg for arg in extras if arg != "--"]
+    elif extras:
+        parser.error(f"unrecognized arguments: {' '.join(extras)}")
+    if getattr(args, "workers", None) == 0:
+        args.workers = None
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
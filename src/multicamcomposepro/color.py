@@ -0,0 +1,136 @@
+import json
+import os
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+CCM_KEY = "Color Correction Matrix"
+
+# sRGB values of the 24 patches of an X-Rite ColorChecker Classic, row by row
+# from dark skin to black, converted to BGR to match OpenCV frames
+COLORCHECKER_BGR = np.array(
+    [
+        [115, 82, 68],
+        [194, 150, 130],
+        [98, 122, 157],
+        [87, 108, 67],
+        [133, 128, 177],
+        [103, 189, 170],
+        [214, 126, 44],
+        [80, 91, 166],
+        [193, 90, 99],
+        [94, 60, 108],
+        [157, 188, 64],
+        [224, 163, 46],
+        [56, 61, 150],
+        [70, 148, 73],
+        [175, 54, 60],
+        [231, 199, 31],
+        [187, 86, 149],
+        [8, 133, 161],
+        [243, 243, 242],
+        [200, 200, 200],
+        [160, 160, 160],
+        [122, 122, 121],
+        [85, 85, 85],
+        [52, 52, 52],
+    ],
+    dtype=np.float64,
+)[:, ::-1]
+
+
+def sample_patches(
+    frame: np.ndarray,
+    box: Optional[Tuple[int, int, int, int]] = None,
+    rows: int = 4,
+    cols: int = 6,
+    margin: float = 0.25,
+) -> np.ndarray:
+    """
+    Mean BGR value of every patch of a color target.
+
+    :param frame: BGR frame showing the target.
+    :param box: (x, y, width, height) of the patch grid. Defaults to the whole frame.
+    :param rows: Number of patch rows.
+    :param cols: Number of patch columns.
+    :param margin: Fraction of each cell ignored at every side, to skip borders.
+    :return: (rows * cols, 3) float array in row-major order.
+    """
+    x, y, width, height = box or (0, 0, frame.shape[1], frame.shape[0])
+    cell_w, cell_h = width / cols, height / rows
+    patches = []
+    for row in range(rows):
+        for col in range(cols):
+            left = int(x + (col + margin) * cell_w)
+            right = int(np.ceil(x + (col + 1 - margin) * cell_w))
+            top = int(y + (row + margin) * cell_h)
+            bottom = int(np.ceil(y + (row + 1 - margin) * cell_h))
+            patches.append(cv2.mean(frame[top:bottom, left:right])[:3])
+    return np.array(patches)
+
+
+def estimate_ccm(measured: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """
+    Least-squares 3x3 matrix M with reference ~= M @ measured for every patch.
+
+    :param measured: (n, 3) colors seen by the camera.
+    :param reference: (n, 3) target colors in the same channel order.
+    """
+    measured = np.asarray(measured, dtype=np.float64)
+    reference = np.asarray(reference, dtype=np.float64)
+    if measured.shape != reference.shape or measured.shape[0] < 3:
+        raise ValueError(
+            "measured and reference must both have shape (n, 3) with n >= 3, "
+            f"got {measured.shape} and {reference.shape}"
+        )
+    solution, *_ = np.linalg.lstsq(measured, reference, rcond=None)
+    return solution.T
+
+
+def apply_ccm(
+    frame: np.ndarray, matrix: np.ndarray, dst: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Apply a 3x3 color-correction matrix with one saturating cv2.transform."""
+    return cv2.transform(frame, np.asarray(matrix, dtype=np.float32), dst)
+
+
+def calibrate(
+    frame: np.ndarray,
+    box: Optional[Tuple[int, int, int, int]] = None,
+    reference: Optional[Sequence] = None,
+) -> np.ndarray:
+    """
+    Estimate a color-correction matrix from a frame of a color target.
+
+    :param frame: BGR frame showing the target.
+    :param box: (x, y, width, height) of the patch grid. Defaults to the whole frame.
+    :param reference: (n, 3) BGR target colors in row-major patch order, on a
+        4 x n/4 grid. Defaults to the ColorChecker Classic.
+    """
+    reference = COLORCHECKER_BGR if reference is None else np.asarray(reference)
+    if len(reference) < 4 or len(reference) % 4:
+        raise ValueError(
+            f"Expected a multiple of 4 reference colors, got {len(reference)}"
+        )
+    measured = sample_patches(frame, box, rows=4, cols=len(reference) // 4)
+    return estimate_ccm(measured, reference)
+
+
+def save_ccm(
+    cam_idx: int, matrix: np.ndarray, filename: str = "camera_config.json"
+) -> None:
+    """Store a matrix in the entry of camera cam_idx in camera_config.json."""
+    if not os.path.exists(filename):
+        raise ValueError(f"{filename} not found, configure the cameras first")
+    with open(filename, "r") as f:
+        config = json.load(f)
+    for camera in config:
+        if camera["Camera"] == cam_idx:
+            camera[CCM_KEY] = np.round(matrix, 6).tolist()
+            break
+    else:
+        raise ValueError(f"Camera {cam_idx} is not in {filename}")
+    with open(filename, "w") as f:
+        json.dump(config, f, indent=4)
+    print(f"Saved color correction matrix for camera {cam_idx}.")
@@ -0,0 +1,192 @@
+import logging
+import os
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .augment import AUGMENTED_NAME
+from .catalog import iter_dataset_images
+
+DCT_SIZE = 32
+HASH_SIZE = 8
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II matrix, so dct(x) = C @ x @ C.T."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+# Only the low-frequency rows are needed for the hash
+_DCT_LOW = _dct_matrix(DCT_SIZE)[:HASH_SIZE]
+
+
+def downscale(img: np.ndarray) -> np.ndarray:
+    """Grayscale DCT_SIZE x DCT_SIZE float32 thumbnail used for hashing."""
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(
+        img, (DCT_SIZE, DCT_SIZE), interpolation=cv2.INTER_AREA
+    ).astype(np.float32)
+
+
+def phash_batch(thumbnails: np.ndarray) -> List[int]:
+    """
+    Perceptual hashes for a stack of thumbnails of shape (n, DCT_SIZE, DCT_SIZE).
+
+    The low-frequency DCT block of every thumbnail is computed with two batched
+    matrix products, and each bit is set where a coefficient exceeds the block median.
+    """
+    low = _DCT_LOW @ thumbnails @ _DCT_LOW.T
+    flat = low.reshape(len(thumbnails), -1)
+    bits = flat > np.median(flat, axis=1, keepdims=True)
+    packed = np.packbits(bits, axis=1)
+    return [int.from_bytes(row.tobytes(), "big") for row in packed]
+
+
+def phash(img: np.ndarray) -> int:
+    """64-bit perceptual hash of a BGR or grayscale image."""
+    return phash_batch(downscale(img)[None])[0]
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over Hamming distance.
+
+    A search with threshold t only visits children whose edge distance is within t
+    of the query distance, so lookups avoid comparing against every stored hash.
+    """
+
+    def __init__(self) -> None:
+        self.root = None
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, value: int, item=None) -> None:
+        self.size += 1
+        node = [value, item, {}]
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            distance = hamming(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value: int, threshold: int) -> List[Tuple[int, object]]:
+        """Return (distance, item) pairs within threshold, closest first."""
+        if self.root is None:
+            return []
+        matches = []
+        stack = [self.root]
+        while stack:
+            node_value, item, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= threshold:
+                matches.append((distance, item))
+            for edge, child in children.items():
+                if distance - threshold <= edge <= distance + threshold:
+                    stack.append(child)
+        return sorted(matches, key=lambda match: match[0])
+
+
+def find_duplicates(
+    paths: Sequence[str], threshold: int = 4, batch_size: int = 256
+) -> List[dict]:
+    """
+    Find near-duplicate images among paths.
+
+    Images are hashed in batches. Each image is compared with the earlier images
+    through a BK-tree. It is reported as a duplicate of the closest match within
+    threshold bits, else added to the tree.
+
+    :return: [{"path", "duplicate_of", "distance"}, ...]
+    """
+    tree = BKTree()
+    duplicates = []
+    for start in range(0, len(paths), batch_size):
+        batch = []
+        for path in paths[start : start + batch_size]:
+            img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                logging.error(f"Could not read {path}")
+                continue
+            batch.append((path, downscale(img)))
+        if not batch:
+            continue
+        hashes = phash_batch(np.stack([thumbnail for _, thumbnail in batch]))
+        for (path, _), value in zip(batch, hashes):
+            matches = tree.search(value, threshold)
+            if matches:
+                distance, original = matches[0]
+                duplicates.append(
+                    {"path": path, "duplicate_of": original, "distance": distance}
+                )
+            else:
+                tree.add(value, path)
+    return duplicates
+
+
+def deduplicate(
+    object_name: str,
+    threshold: int = 4,
+    remove: bool = False,
+    catalog=None,
+    groups: Optional[Iterable[Tuple[str, str, str]]] = None,
+) -> List[dict]:
+    """
+    Report, and optionally remove, near-duplicate captures of a warehouse object.
+
+    Duplicates are searched within each (split, label, angle) directory. Augmented
+    files are ignored. Outputs augmented from a removed capture are cleaned up by
+    the next DataAugmenter.augment_images run.
+
+    :param threshold: Maximum Hamming distance between 64-bit hashes.
+    :param remove: Delete the duplicates, keeping the earliest file.
+    :param catalog: Optional Catalog to remove deleted files from.
+    :param groups: Only check these (split, label, angle) groups.
+    """
+    object_dir = os.path.join(
+        os.getcwd(), "data_warehouse", "dataset", object_name.replace(" ", "_")
+    )
+    listing = {}
+    for record in iter_dataset_images(object_dir):
+        if AUGMENTED_NAME.search(record["path"]):
+            continue
+        key = (record["split"], record["label"], record["angle"])
+        listing.setdefault(key, []).append(os.path.join(object_dir, record["path"]))
+    if groups is not None:
+        groups = set(groups)
+        listing = {key: paths for key, paths in listing.items() if key in groups}
+
+    duplicates = []
+    for key, paths in sorted(listing.items()):
+        for duplicate in find_duplicates(paths, threshold):
+            print(
+                f"{os.path.relpath(duplicate['path'], object_dir)} duplicates "
+                f"{os.path.basename(duplicate['duplicate_of'])} "
+                f"(distance {duplicate['distance']})"
+            )
+            if remove:
+                os.remove(duplicate["path"])
+                if catalog is not None:
+                    catalog.remove(duplicate["path"])
+            duplicates.append(duplicate)
+
+    action = "Removed" if remove else "Found"
+    print(f"{action} {len(duplicates)} near-duplicate images.")
+    return duplicates
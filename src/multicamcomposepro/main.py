@@ -1,12 +1,15 @@
+import logging
+
 from .augment import DataAugmenter
 from .camera import CameraManager
+from .session import PipelinedSession
 from .utils import CameraConfigurator, Warehouse
 
 object_name = "test_object_without_input"
 anomalies = ["cracked screen", "discolored front"]
 
 
-def main():
+def main(pipelined=True):
     # Create a structured data warehouse
     warehouse = Warehouse()
     warehouse.build(object_name, anomalies)
@@ -15,12 +18,23 @@ def main():
     CameraConfigurator()
 
     camera_manager = CameraManager(warehouse, 2, 3, allow_user_input=True)
-    camera_manager.run()
-    print(warehouse)
+    augmenter = DataAugmenter(
+        object_name,
+        temperature=0.05,
+        logging_enabled=False,
+        catalog=warehouse.catalog.sync(),
+    )
 
-    augmenter = DataAugmenter(object_name, temperature=0.05, logging_enabled=False)
-    augmenter.augment_images()  # Pass selected_images if needed
+    if pipelined:
+        # Augment each train/good set in the background while capture continues
+        PipelinedSession(camera_manager, augmenter).run()
+        print(warehouse)
+    else:
+        camera_manager.run()
+        print(warehouse)
+        augmenter.augment_images()  # Pass selected_images if needed
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
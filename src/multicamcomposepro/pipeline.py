@@ -0,0 +1,292 @@
+import json
+import logging
+import random
+from collections import defaultdict
+from time import perf_counter
+from typing import List, Optional
+
+import numpy as np
+
+# Op name -> (DataAugmenter method, whether the method accepts a dst buffer)
+OPS = {
+    "white_balance": ("random_white_balance", True),
+    "exposure": ("random_exposure", True),
+    "rotation": ("random_rotation", True),
+    # Always flips, the op's p is the flip probability
+    "mirror": ("mirror", True),
+    "lens_distortion": ("random_lens_distortion", True),
+    "crop": ("random_crop", True),
+    "texture_overlay": ("random_texture_overlay", True),
+    "gaussian_blur": ("random_gaussian_blur", True),
+    "pixel_dropout": ("random_pixel_dropout", False),
+}
+
+# Photometric ops whose parameters are drawn once per multi-view group.
+# Op name -> DataAugmenter method returning the fixed keyword arguments.
+SHARED_OPS = {
+    "white_balance": "draw_white_balance",
+    "exposure": "draw_exposure",
+}
+
+DEFAULT_OPS = [
+    {"op": "white_balance"},
+    {"op": "exposure"},
+    {"op": "rotation"},
+    # Mirroring is too large of an augmentation for most objects.
+    {"op": "mirror", "p": 0.0},
+    {"op": "lens_distortion"},
+    {"op": "gaussian_blur"},
+    {"op": "pixel_dropout"},
+]
+
+
+class AugmentationOp:
+    """
+    One step of an AugmentationPipeline.
+
+    :param name: Name of the op, one of OPS.
+    :param p: Probability that the op is applied to an image.
+    :param params: Keyword arguments passed to the DataAugmenter method, e.g.
+        parameter ranges such as {"angle_range": [-5, 5]}.
+    """
+
+    def __init__(self, name: str, p: float = 1.0, params: Optional[dict] = None):
+        if name not in OPS:
+            raise ValueError(
+                f"Unknown augmentation op '{name}'. Valid ops: {', '.join(OPS)}"
+            )
+        if not 0.0 <= p <= 1.0:
+            raise ValueError(f"Probability for '{name}' must be in [0, 1], got {p}")
+        self.name = name
+        self.p = p
+        self.params = params or {}
+        if name == "lens_distortion" and "factor_range" in self.params:
+            logging.warning(
+                "lens_distortion factor_range is deprecated, use k1_range and k2_range"
+            )
+        self.method, self.takes_dst = OPS[name]
+
+    def sample(self) -> bool:
+        """
+        Decide whether the op runs on the next image.
+
+        Only draws for 0 < p < 1, so enabled and disabled ops do not consume random
+        state and do not shift the draws of the ops after them.
+        """
+        if self.p >= 1.0:
+            return True
+        if self.p <= 0.0:
+            return False
+        return random.random() < self.p
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AugmentationOp":
+        return cls(data["op"], data.get("p", 1.0), data.get("params"))
+
+    def to_dict(self) -> dict:
+        return {"op": self.name, "p": self.p, "params": self.params}
+
+    def __repr__(self) -> str:
+        return f"AugmentationOp({self.name!r}, p={self.p}, params={self.params})"
+
+
+class PipelineProfiler:
+    """
+    Accumulates wall time per op, per image and per resolution.
+
+    Example:
+        profiler = PipelineProfiler()
+        augmenter = DataAugmenter("apple", profiler=profiler)
+        augmenter.augment_images()
+        print(profiler.summary())
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.op_calls = defaultdict(int)
+        self.op_seconds = defaultdict(float)
+        self.image_seconds = defaultdict(float)
+        self.resolution_seconds = defaultdict(lambda: defaultdict(float))
+
+    def record(self, op: str, filename: str, resolution: str, seconds: float) -> None:
+        self.op_calls[op] += 1
+        self.op_seconds[op] += seconds
+        self.image_seconds[filename] += seconds
+        self.resolution_seconds[resolution][op] += seconds
+
+    def report(self) -> dict:
+        return {
+            "ops": {
+                op: {
+                    "calls": self.op_calls[op],
+                    "total_s": self.op_seconds[op],
+                    "mean_ms": 1000 * self.op_seconds[op] / self.op_calls[op],
+                }
+                for op in self.op_seconds
+            },
+            "images": dict(self.image_seconds),
+            "resolutions": {
+                res: dict(ops) for res, ops in self.resolution_seconds.items()
+            },
+        }
+
+    def summary(self) -> str:
+        total = sum(self.op_seconds.values()) or 1.0
+        lines = [f"{'op':<16}{'calls':>8}{'total s':>10}{'mean ms':>10}{'share':>8}"]
+        for op, seconds in sorted(
+            self.op_seconds.items(), key=lambda item: item[1], reverse=True
+        ):
+            calls = self.op_calls[op]
+            lines.append(
+                f"{op:<16}{calls:>8}{seconds:>10.3f}"
+                f"{1000 * seconds / calls:>10.2f}{seconds / total:>8.1%}"
+            )
+        for res, ops in self.resolution_seconds.items():
+            slowest = max(ops, key=ops.get)
+            lines.append(f"{res}: {sum(ops.values()):.3f} s, slowest op {slowest}")
+        return "\n".join(lines)
+
+
+class AugmentationPipeline:
+    """
+    Ordered list of AugmentationOps applied by DataAugmenter.process_image.
+
+    Example JSON:
+        {"ops": [{"op": "rotation", "p": 0.5, "params": {"angle_range": [-5, 5]}},
+                 {"op": "gaussian_blur", "params": {"sigma_range": [0.1, 1.0]}}]}
+    """
+
+    def __init__(self, ops: Optional[List[AugmentationOp]] = None) -> None:
+        if ops is None:
+            ops = [AugmentationOp.from_dict(op) for op in DEFAULT_OPS]
+        self.ops: List[AugmentationOp] = list(ops)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AugmentationPipeline":
+        return cls([AugmentationOp.from_dict(op) for op in data["ops"]])
+
+    @classmethod
+    def from_json(cls, filename: str) -> "AugmentationPipeline":
+        with open(filename, "r") as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self) -> dict:
+        return {"ops": [op.to_dict() for op in self.ops]}
+
+    def save_json(self, filename: str) -> None:
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    def apply(
+        self,
+        augmenter,
+        img,
+        filename: str = "",
+        profiler: Optional[PipelineProfiler] = None,
+    ):
+        """
+        Run every op on img once, using the augmenter's scratch buffers.
+
+        :return: The augmented image and a list of (op name, logged value) pairs.
+        """
+        applied = []
+        source = img
+        resolution = f"{img.shape[1]}x{img.shape[0]}"
+        for op in self.ops:
+            if not op.sample():
+                continue
+
+            method = getattr(augmenter, op.method)
+            kwargs = dict(op.params)
+            if op.takes_dst:
+                kwargs["dst"] = augmenter.swap_buffer(img)
+            elif np.may_share_memory(img, source):
+                # In-place op before any copy: work on scratch, not the caller's image
+                buf = augmenter.swap_buffer(img)
+                np.copyto(buf, img)
+                img = buf
+
+            start = perf_counter()
+            result = method(img, **kwargs)
+            if profiler is not None:
+                profiler.record(op.name, filename, resolution, perf_counter() - start)
+
+            if isinstance(result, tuple):
+                img, val = result
+            else:
+                img, val = result, None
+            applied.append((op.name, val))
+        return img, applied
+
+    def apply_group(
+        self,
+        augmenter,
+        views,
+        filename: str = "",
+        profiler: Optional[PipelineProfiler] = None,
+    ):
+        """
+        Run every op once on all views of one capture.
+
+        Whether an op runs and the parameters of SHARED_OPS are drawn once for the
+        whole group, so all views get the same photometric change. Geometric ops
+        are drawn per view.
+
+        :param views: Stacked batch of shape (views, height, width, channels), which
+            is modified in place, or a list of images if the shapes differ, which
+            are left unchanged.
+        :return: The augmented batch, or a list of images if an op changed the
+            shape of a view, and a list of (op name, logged value) pairs.
+        """
+        applied = []
+        batch = views if isinstance(views, np.ndarray) else None
+        views = list(views)
+        sources = list(views)
+        resolution = f"{views[0].shape[1]}x{views[0].shape[0]}"
+        for op in self.ops:
+            if not op.sample():
+                continue
+
+            method = getattr(augmenter, op.method)
+            start = perf_counter()
+            if op.name in SHARED_OPS:
+                fixed = getattr(augmenter, SHARED_OPS[op.name])(**op.params)
+                if batch is not None:
+                    # One call over all views, in place on the stacked batch
+                    flat = batch.reshape((-1,) + batch.shape[2:])
+                    _, val = method(flat, dst=flat, **fixed)
+                else:
+                    for k, view in enumerate(views):
+                        dst = augmenter.swap_buffer(view, k)
+                        views[k], val = method(view, dst=dst, **fixed)
+            else:
+                val = []
+                for k, view in enumerate(views):
+                    kwargs = dict(op.params)
+                    if op.takes_dst:
+                        kwargs["dst"] = augmenter.swap_buffer(view, k)
+                    elif batch is None and np.may_share_memory(view, sources[k]):
+                        buf = augmenter.swap_buffer(view, k)
+                        np.copyto(buf, view)
+                        view = buf
+                    result = method(view, **kwargs)
+                    if isinstance(result, tuple):
+                        out, view_val = result
+                    else:
+                        out, view_val = result, None
+                    val.append(view_val)
+
+                    if batch is None:
+                        views[k] = out
+                    elif out.shape != view.shape:
+                        # The op changed the shape, continue with separate views
+                        batch = None
+                        views[k] = out
+                    elif not np.may_share_memory(out, view):
+                        np.copyto(view, out)
+            if profiler is not None:
+                profiler.record(op.name, filename, resolution, perf_counter() - start)
+            applied.append((op.name, val))
+        return (views if batch is None else batch), applied
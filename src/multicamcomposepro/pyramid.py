@@ -0,0 +1,264 @@
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .utils import file_sha256
+
+INDEX_NAME = "index.json"
+
+
+def build_levels(
+    source: str, level_dir: str, sizes: Sequence[Tuple[int, int]]
+) -> List[Tuple[int, int]]:
+    """
+    Decode source once and write every (width, height) level as PNG into level_dir.
+
+    Levels are made in descending order, each from the previous one with INTER_AREA.
+    They are written under a temporary directory and renamed, so readers never see
+    a partial pyramid. Levels that already exist in level_dir, e.g. when a source
+    with the same content was cached with other sizes, are kept.
+    """
+    missing = [
+        (width, height)
+        for width, height in sizes
+        if not os.path.exists(os.path.join(level_dir, f"{width}x{height}.png"))
+    ]
+    if not missing:
+        return list(sizes)
+    img = cv2.imread(source, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError(f"Could not read {source}")
+
+    tmp_dir = f"{level_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for width, height in sizes:
+        img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+        cv2.imwrite(os.path.join(tmp_dir, f"{width}x{height}.png"), img)
+    try:
+        os.replace(tmp_dir, level_dir)
+    except OSError:
+        # The directory exists, from other sizes or another process: add the
+        # missing levels one file at a time
+        for width, height in missing:
+            name = f"{width}x{height}.png"
+            os.replace(os.path.join(tmp_dir, name), os.path.join(level_dir, name))
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return list(sizes)
+
+
+def _build_levels_job(job):
+    # None marks an unreadable source, so one bad file does not abort the build
+    try:
+        return build_levels(*job)
+    except ValueError:
+        return None
+
+
+class PyramidCache:
+    """
+    Cache of downscaled copies of warehouse images.
+
+    Each source is decoded once into a pyramid of smaller levels stored under
+    data_warehouse/cache/pyramid/<hash[:2]>/<hash>/<width>x<height>.png, keyed by the
+    SHA-256 of the source file. index.json maps source paths to their size, mtime and
+    hash, so unchanged sources are not rehashed and a changed source gets a new
+    pyramid. Consumers ask for the smallest level that is at least a given size.
+
+    :param cache_dir: Cache directory. Defaults to data_warehouse/cache/pyramid.
+    :param sizes: Shortest-side lengths of the levels. If None, levels halve the
+        source until the shortest side would drop below min_size.
+    :param min_size: Smallest shortest side of a power-of-two level.
+
+    Example:
+        pyramid = PyramidCache()
+        batch_resize("data_warehouse/dataset", "resized", (224, 224), pyramid=pyramid)
+        thumbnail = pyramid.load("data_warehouse/dataset/apple/train/good/Front/000.png", 64)
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        sizes: Optional[Sequence[int]] = None,
+        min_size: int = 32,
+    ) -> None:
+        self.cache_dir = cache_dir or os.path.join(
+            os.getcwd(), "data_warehouse", "cache", "pyramid"
+        )
+        self.sizes = sorted(set(sizes), reverse=True) if sizes else None
+        self.min_size = min_size
+        self.index_path = os.path.join(self.cache_dir, INDEX_NAME)
+        self.index = self.load_index()
+
+    def load_index(self) -> dict:
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        return {}
+
+    def save_index(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.index_path + ".tmp", "w") as f:
+            json.dump(self.index, f, indent=4)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+    def level_sizes(self, width: int, height: int) -> List[Tuple[int, int]]:
+        """(width, height) of every level for a source, largest first."""
+        shortest = min(width, height)
+        if self.sizes is None:
+            sides = []
+            side = shortest // 2
+            while side >= self.min_size:
+                sides.append(side)
+                side //= 2
+        else:
+            sides = [side for side in self.sizes if side < shortest]
+        return [
+            (
+                max(1, round(width * side / shortest)),
+                max(1, round(height * side / shortest)),
+            )
+            for side in sides
+        ]
+
+    def level_dir(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    def has_levels(self, digest: str, levels) -> bool:
+        """Whether every (width, height) level file of a pyramid exists."""
+        level_dir = self.level_dir(digest)
+        return all(
+            os.path.exists(os.path.join(level_dir, f"{width}x{height}.png"))
+            for width, height in levels
+        )
+
+    def entry(self, path: str) -> Optional[dict]:
+        """Index entry for path if its pyramid is current, else None."""
+        entry = self.index.get(os.path.abspath(path))
+        if entry is None:
+            return None
+        stat = os.stat(path)
+        if (entry["size"], entry["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        levels = self.level_sizes(entry["width"], entry["height"])
+        if [list(level) for level in levels] != entry["levels"]:
+            return None  # Built with other sizes
+        if not self.has_levels(entry["hash"], entry["levels"]):
+            return None
+        return entry
+
+    def update(self, paths: Iterable[str], workers: Optional[int] = 1) -> int:
+        """
+        Build pyramids for sources that are new or changed.
+
+        Unreadable sources are logged and left out of the index, so get() returns
+        their original path. Entries of sources that no longer exist are dropped.
+
+        :param workers: Number of build processes. None uses all CPUs.
+        :return: Number of pyramids built.
+        """
+        pruned = self.prune()
+        jobs, entries = [], {}
+        for path in paths:
+            if self.entry(path) is not None:
+                continue
+            try:
+                stat = os.stat(path)
+                digest = file_sha256(path)
+                with Image.open(path) as img:
+                    width, height = img.size
+            except OSError as e:
+                logging.error(f"Could not read {path}, not caching it: {e}")
+                continue
+            levels = self.level_sizes(width, height)
+            entry = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "hash": digest,
+                "width": width,
+                "height": height,
+                "levels": [list(level) for level in levels],
+            }
+            entries[os.path.abspath(path)] = entry
+            if not self.has_levels(digest, levels):
+                jobs.append((path, self.level_dir(digest), levels))
+
+        if not entries:
+            if pruned:
+                self.save_index()
+            return 0
+
+        for job in jobs:
+            os.makedirs(os.path.dirname(job[1]), exist_ok=True)
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_build_levels_job, jobs, chunksize=8))
+        else:
+            results = [_build_levels_job(job) for job in jobs]
+
+        built = 0
+        for job, result in zip(jobs, results):
+            if result is None:
+                logging.error(f"Could not decode {job[0]}, not caching it")
+                entries.pop(os.path.abspath(job[0]), None)
+            else:
+                built += 1
+
+        for path, entry in entries.items():
+            old = self.index.get(path)
+            self.index[path] = entry
+            if old is not None and old["hash"] != entry["hash"]:
+                self.discard(old["hash"])
+        self.save_index()
+        logging.info(f"Built {built} pyramids in {self.cache_dir}")
+        return built
+
+    def prune(self) -> int:
+        """
+        Drop index entries of sources that no longer exist, e.g. after
+        batch_resize(overwrite_original=True), and their unshared pyramids.
+
+        :return: Number of dropped entries.
+        """
+        removed = [path for path in self.index if not os.path.exists(path)]
+        digests = {self.index.pop(path)["hash"] for path in removed}
+        for digest in digests:
+            self.discard(digest)
+        return len(removed)
+
+    def discard(self, digest: str) -> None:
+        """Remove a pyramid unless another indexed source has the same content."""
+        if any(entry["hash"] == digest for entry in self.index.values()):
+            return
+        shutil.rmtree(self.level_dir(digest), ignore_errors=True)
+
+    def get(self, path: str, min_side: int) -> str:
+        """
+        Return the path of the smallest level whose shortest side is at least
+        min_side, or path itself if no level is large enough.
+        """
+        entry = self.entry(path)
+        if entry is None:
+            self.update([path])
+            entry = self.index.get(os.path.abspath(path))
+            if entry is None:  # Unreadable, resize from the original
+                return path
+        for width, height in reversed(entry["levels"]):
+            if min(width, height) >= min_side:
+                return os.path.join(
+                    self.level_dir(entry["hash"]), f"{width}x{height}.png"
+                )
+        return path
+
+    def load(
+        self, path: str, min_side: int, flags: int = cv2.IMREAD_COLOR
+    ) -> np.ndarray:
+        """Decode the level returned by get()."""
+        return cv2.imread(self.get(path, min_side), flags)
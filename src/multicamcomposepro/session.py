@@ -0,0 +1,156 @@
+import logging
+import os
+import queue
+import threading
+import time
+from typing import List, Optional
+
+from .augment import DataAugmenter
+from .camera import CameraManager
+
+
+class AugmentationStage:
+    """
+    Background thread that augments captured view sets as they arrive.
+
+    Sets are passed through a bounded queue. When max_pending sets are waiting,
+    submit() blocks, so a slow augmenter slows capture down instead of piling up
+    sets in memory. close() is the barrier: it waits until every submitted set is
+    augmented.
+
+    :param augmenter: DataAugmenter used only by the background thread.
+    :param max_pending: Number of sets that may wait for augmentation.
+    """
+
+    def __init__(self, augmenter: DataAugmenter, max_pending: int = 2) -> None:
+        if max_pending < 1:
+            raise ValueError(f"max_pending must be at least 1, got {max_pending}")
+        self.augmenter = augmenter
+        self.queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.busy: List[tuple] = []  # (start, end) of every augmented set
+        self.stall_time = 0.0
+        self.failed = 0
+        self.thread = threading.Thread(
+            target=self._worker, name="mccp-augment", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, folder_path: str, filenames: List[str]) -> None:
+        """Queue one set, blocking while the queue is full."""
+        names = sorted({os.path.basename(filename) for filename in filenames})
+        if not names:
+            return
+        start = time.perf_counter()
+        self.queue.put(names)
+        self.stall_time += time.perf_counter() - start
+        logging.info(f"Queued {names} from {folder_path} for augmentation")
+
+    def _worker(self) -> None:
+        while True:
+            names = self.queue.get()
+            try:
+                if names is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    self.augmenter.augment_images(selected_images=names)
+                except Exception:
+                    logging.exception(f"Augmentation of {names} failed")
+                    self.failed += 1
+                self.busy.append((start, time.perf_counter()))
+            finally:
+                self.queue.task_done()
+
+    def close(self) -> None:
+        """Wait for all queued sets to be augmented and stop the thread."""
+        self.queue.put(None)
+        self.thread.join()
+
+    def overlap(self, until: float) -> float:
+        """Seconds of augmentation that ran before time.perf_counter() == until."""
+        return sum(max(0.0, min(end, until) - start) for start, end in self.busy)
+
+
+class PipelinedSession:
+    """
+    Capture session that augments train/good sets while capture continues.
+
+    Every finished train/good view set is handed to an AugmentationStage, so the
+    CPU augments while the operator repositions the object for the next set and for
+    the test and anomaly captures. Other sets are only captured. run() returns
+    after the last queued set is augmented.
+
+    :param camera_manager: Configured CameraManager.
+    :param augmenter: DataAugmenter for the same object. If it has no catalog, the
+        catalog of the camera manager's warehouse is synced with disk and used, so
+        augmented outputs are cataloged next to the captures.
+    :param max_pending: Number of sets that may wait for augmentation.
+
+    Example:
+        session = PipelinedSession(CameraManager(warehouse), DataAugmenter("apple"))
+        report = session.run()
+    """
+
+    def __init__(
+        self,
+        camera_manager: CameraManager,
+        augmenter: DataAugmenter,
+        max_pending: int = 2,
+    ) -> None:
+        self.camera_manager = camera_manager
+        self.augmenter = augmenter
+        if augmenter.catalog is None:
+            catalog = getattr(camera_manager.warehouse, "catalog", None)
+            # Bring it up to date first, it may predate the captures on disk
+            augmenter.catalog = None if catalog is None else catalog.sync()
+        self.max_pending = max_pending
+        self.report: Optional[dict] = None
+
+    def run(self) -> dict:
+        """
+        Capture and augment, then report the timings in seconds.
+
+        capture is the wall time of camera_manager.run(), augment the time spent
+        augmenting, overlapped the part of augment that ran during capture, drain the
+        wait at the final barrier and stalled the time capture waited on a full
+        queue. A sequential run takes about capture + augment.
+        """
+        stage = AugmentationStage(self.augmenter, self.max_pending)
+        train_dir = os.path.normcase(os.path.abspath(self.augmenter.object_dir))
+        previous = self.camera_manager.on_capture_set
+
+        def on_capture_set(folder_path: str, filenames: List[str]) -> None:
+            if previous is not None:
+                previous(folder_path, filenames)
+            if os.path.normcase(os.path.abspath(folder_path)) == train_dir:
+                stage.submit(folder_path, filenames)
+
+        self.camera_manager.on_capture_set = on_capture_set
+        start = time.perf_counter()
+        try:
+            self.camera_manager.run()
+        finally:
+            capture_end = time.perf_counter()
+            self.camera_manager.on_capture_set = previous
+            stage.close()
+        end = time.perf_counter()
+
+        augment = sum(busy_end - busy_start for busy_start, busy_end in stage.busy)
+        self.report = {
+            "sets": len(stage.busy),
+            "failed": stage.failed,
+            "capture": capture_end - start,
+            "augment": augment,
+            "overlapped": stage.overlap(capture_end),
+            "drain": end - capture_end,
+            "stalled": stage.stall_time,
+            "total": end - start,
+        }
+        print(
+            f"Augmented {self.report['sets']} sets. "
+            f"Capture {self.report['capture']:.1f}s, "
+            f"augmentation {self.report['augment']:.1f}s of which "
+            f"{self.report['overlapped']:.1f}s overlapped capture, "
+            f"final wait {self.report['drain']:.1f}s."
+        )
+        return self.report
@@ -0,0 +1,307 @@
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .augment import AUGMENTED_NAME
+from .catalog import iter_dataset_images
+from .utils import center_crop_box
+
+INDEX_NAME = "index.json"
+
+
+def load_square(path: str, image_size: Tuple[int, int]) -> np.ndarray:
+    """Decode an image, centre crop it to a square and resize to (height, width)."""
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not read {path}")
+    left, upper, right, lower = center_crop_box(img.shape[1], img.shape[0])
+    height, width = image_size
+    return cv2.resize(
+        img[upper:lower, left:right], (width, height), interpolation=cv2.INTER_AREA
+    )
+
+
+def _load_square_job(job):
+    # None marks an unreadable file, so one bad image does not abort the export
+    try:
+        return load_square(*job)
+    except ValueError:
+        return None
+
+
+class ShardWriter:
+    """
+    Pack a warehouse object into a few large fixed-shape uint8 .npy shards.
+
+    Each shard has shape (n, height, width, 3) in BGR order. index.json lists every
+    image with its shard, offset, split, label, angle and source path. Exporting
+    again only appends images that are new or changed since the last export.
+
+    :param object_name: Name of the object in the data warehouse.
+    :param output_dir: Shard directory. Defaults to data_warehouse/shards/<object_name>.
+    :param image_size: (height, width) of every packed image.
+    :param shard_size: Maximum number of images per shard.
+    :param workers: Number of decode processes. None uses all CPUs.
+
+    Example:
+        ShardWriter("apple").export()
+        for images, records in ShardReader("data_warehouse/shards/apple").batches(64):
+            ...
+    """
+
+    def __init__(
+        self,
+        object_name: str,
+        output_dir: Optional[str] = None,
+        image_size: Tuple[int, int] = (224, 224),
+        shard_size: int = 1024,
+        workers: Optional[int] = None,
+    ) -> None:
+        object_name = object_name.replace(" ", "_")
+        base_dir = os.path.join(os.getcwd(), "data_warehouse")
+        self.object_dir = os.path.join(base_dir, "dataset", object_name)
+        self.output_dir = output_dir or os.path.join(base_dir, "shards", object_name)
+        self.image_size = tuple(image_size)
+        self.shard_size = shard_size
+        self.workers = workers
+        self.index = self.load_index()
+
+    def load_index(self) -> dict:
+        path = os.path.join(self.output_dir, INDEX_NAME)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                index = json.load(f)
+            if tuple(index["image_size"]) != self.image_size:
+                raise ValueError(
+                    f"Shards in {self.output_dir} have image size "
+                    f"{index['image_size']}, not {list(self.image_size)}"
+                )
+            return index
+        return {"image_size": list(self.image_size), "shards": [], "records": []}
+
+    def save_index(self) -> None:
+        path = os.path.join(self.output_dir, INDEX_NAME)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.index, f, indent=4)
+        os.replace(path + ".tmp", path)
+
+    def pending(self, on_disk: Optional[List[dict]] = None) -> List[dict]:
+        """Records on disk that are not in the index yet, or changed since export."""
+        if on_disk is None:
+            on_disk = list(iter_dataset_images(self.object_dir))
+        exported = {
+            record["path"]: (record["size"], record["mtime"])
+            for record in self.index["records"]
+        }
+        records = [
+            record
+            for record in on_disk
+            if exported.get(record["path"]) != (record["size"], record["mtime"])
+        ]
+        for record in records:
+            record["augmented"] = bool(AUGMENTED_NAME.search(record["path"]))
+        return records
+
+    def prune(self, on_disk: List[dict]) -> int:
+        """
+        Drop index records whose source file no longer exists.
+
+        Their pixels stay in the shards as dead space, like replaced records.
+
+        :return: Number of dropped records.
+        """
+        paths = {record["path"] for record in on_disk}
+        kept = [record for record in self.index["records"] if record["path"] in paths]
+        removed = len(self.index["records"]) - len(kept)
+        self.index["records"] = kept
+        return removed
+
+    def export(self) -> int:
+        """
+        Append new and changed images to the shards.
+
+        :return: Number of images written.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        on_disk = list(iter_dataset_images(self.object_dir))
+        removed = self.prune(on_disk)
+        if removed:
+            logging.info(f"Dropped {removed} deleted images from the index")
+        records = self.pending(on_disk)
+        if not records:
+            if removed:
+                self.save_index()
+            print(f"Shards in {self.output_dir} are up to date.")
+            return 0
+
+        # Changed images get a new record; the old pixels stay as dead space
+        changed = {record["path"] for record in records}
+        self.index["records"] = [
+            record for record in self.index["records"] if record["path"] not in changed
+        ]
+
+        jobs = [
+            (os.path.join(self.object_dir, record["path"]), self.image_size)
+            for record in records
+        ]
+        workers = self.workers or os.cpu_count() or 1
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                images = executor.map(_load_square_job, jobs, chunksize=16)
+                written = self._write(records, images)
+        else:
+            written = self._write(records, map(_load_square_job, jobs))
+
+        self.save_index()
+        print(f"Exported {written} images to {self.output_dir}")
+        return written
+
+    def _write(self, records: List[dict], images: Iterator[np.ndarray]) -> int:
+        shards = self.index["shards"]
+        height, width = self.image_size
+        pending = zip(records, images)
+        left = len(records)
+        written = 0
+
+        # Top up the last shard if it is not full
+        carry = None
+        if shards and shards[-1]["count"] < self.shard_size:
+            carry = np.load(os.path.join(self.output_dir, shards.pop()["file"]))
+
+        while left or carry is not None:
+            shard_id = len(shards)
+            filename = f"shard_{shard_id:05d}.npy"
+            start = 0 if carry is None else len(carry)
+            capacity = min(self.shard_size, start + left)
+            tmp_path = os.path.join(self.output_dir, filename + ".tmp")
+            added = []
+            try:
+                shard = np.lib.format.open_memmap(
+                    tmp_path,
+                    mode="w+",
+                    dtype=np.uint8,
+                    shape=(capacity, height, width, 3),
+                )
+                if carry is not None:
+                    shard[:start] = carry
+                    carry = None
+
+                count = start
+                while count < capacity and left:
+                    record, image = next(pending)
+                    left -= 1
+                    if image is None:
+                        logging.error(f"Could not read {record['path']}, skipping it")
+                        continue
+                    shard[count] = image
+                    record.update(shard=shard_id, offset=count)
+                    added.append(record)
+                    count += 1
+
+                if count < capacity:
+                    # Unreadable images left the shard short, store only the filled part
+                    packed = np.lib.format.open_memmap(
+                        tmp_path + ".packed",
+                        mode="w+",
+                        dtype=np.uint8,
+                        shape=(count, height, width, 3),
+                    )
+                    packed[:] = shard[:count]
+                    packed.flush()
+                    del packed, shard
+                    os.replace(tmp_path + ".packed", tmp_path)
+                else:
+                    shard.flush()
+                    del shard
+                if count == 0:
+                    os.remove(tmp_path)
+                    break
+                os.replace(tmp_path, os.path.join(self.output_dir, filename))
+            except BaseException:
+                shard = packed = None
+                for path in (tmp_path, tmp_path + ".packed"):
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+
+            shards.append({"file": filename, "count": count})
+            self.index["records"].extend(added)
+            written += len(added)
+            logging.info(f"Wrote {filename} with {count} images")
+        return written
+
+
+class ShardReader:
+    """
+    Stream images from shards written by ShardWriter.
+
+    Shards are memory mapped and read in order, so iterating is a sequential read.
+
+    :param shard_dir: Directory containing index.json and the shards.
+    """
+
+    def __init__(self, shard_dir: str) -> None:
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, INDEX_NAME), "r") as f:
+            self.index = json.load(f)
+        self.image_size = tuple(self.index["image_size"])
+
+    def __len__(self) -> int:
+        return len(self.index["records"])
+
+    def select(
+        self,
+        split: Optional[str] = None,
+        label: Optional[str] = None,
+        angle: Optional[str] = None,
+        augmented: Optional[bool] = None,
+    ) -> List[dict]:
+        """Return matching records in shard order."""
+        records = [
+            record
+            for record in self.index["records"]
+            if (split is None or record["split"] == split)
+            and (label is None or record["label"] == label)
+            and (angle is None or record["angle"] == angle)
+            and (augmented is None or record["augmented"] == augmented)
+        ]
+        return sorted(records, key=lambda record: (record["shard"], record["offset"]))
+
+    def shard(self, shard_id: int) -> np.ndarray:
+        filename = self.index["shards"][shard_id]["file"]
+        return np.load(os.path.join(self.shard_dir, filename), mmap_mode="r")
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, dict]]:
+        for images, records in self.batches(1):
+            yield images[0], records[0]
+
+    def batches(
+        self, batch_size: int = 64, **filters
+    ) -> Iterator[Tuple[np.ndarray, List[dict]]]:
+        """
+        Yield (images, records) batches in shard order.
+
+        Batches do not span shards. images is a read-only memory-mapped view when
+        the batch is a contiguous run of a shard, otherwise a copy.
+        """
+        records = self.select(**filters)
+        shard_id, shard = None, None
+        start = 0
+        while start < len(records):
+            if records[start]["shard"] != shard_id:
+                shard_id = records[start]["shard"]
+                shard = self.shard(shard_id)
+            batch = records[start : start + batch_size]
+            batch = [record for record in batch if record["shard"] == shard_id]
+            offsets = [record["offset"] for record in batch]
+            if offsets == list(range(offsets[0], offsets[0] + len(offsets))):
+                images = shard[offsets[0] : offsets[-1] + 1]
+            else:
+                images = shard[offsets]
+            yield images, batch
+            start += len(batch)
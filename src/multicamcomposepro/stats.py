@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import cv2
+import numpy as np
+
+from .catalog import iter_dataset_images
+
+
+class ChannelStats:
+    """
+    Mergeable per-channel statistics of a set of BGR images.
+
+    Keeps the pixel count, per-channel mean and sum of squared deviations (M2),
+    256-bin per-channel histograms and a count of image resolutions. Two
+    accumulators are combined with Chan et al.'s parallel update of Welford's
+    algorithm, so partial results from files, workers or earlier runs merge exactly.
+    """
+
+    def __init__(self) -> None:
+        self.images = 0
+        self.pixels = 0
+        self.mean = np.zeros(3)
+        self.m2 = np.zeros(3)
+        self.histogram = np.zeros((3, 256), dtype=np.int64)
+        self.resolutions: Dict[str, int] = {}
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.m2 / self.pixels) if self.pixels else np.zeros(3)
+
+    def update(self, img: np.ndarray) -> None:
+        """Add one uint8 BGR image."""
+        height, width = img.shape[:2]
+        other = ChannelStats()
+        other.images = 1
+        other.pixels = height * width
+        mean, std = cv2.meanStdDev(img)
+        other.mean = mean.ravel()
+        other.m2 = std.ravel() ** 2 * other.pixels
+        for channel in range(3):
+            other.histogram[channel] = cv2.calcHist(
+                [img], [channel], None, [256], [0, 256]
+            ).ravel()
+        other.resolutions[f"{width}x{height}"] = 1
+        self.merge(other)
+
+    def merge(self, other: "ChannelStats") -> "ChannelStats":
+        """Fold other into self and return self."""
+        if other.pixels == 0:
+            return self
+        total = self.pixels + other.pixels
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.pixels / total)
+        self.m2 = self.m2 + other.m2 + delta**2 * (self.pixels * other.pixels / total)
+        self.pixels = total
+        self.images += other.images
+        self.histogram += other.histogram
+        for resolution, count in other.resolutions.items():
+            self.resolutions[resolution] = self.resolutions.get(resolution, 0) + count
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "images": self.images,
+            "pixels": self.pixels,
+            "mean": self.mean.tolist(),
+            "std": self.std.tolist(),
+            "m2": self.m2.tolist(),
+            "histogram": self.histogram.tolist(),
+            "resolutions": dict(sorted(self.resolutions.items())),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChannelStats":
+        stats = cls()
+        stats.images = data["images"]
+        stats.pixels = data["pixels"]
+        stats.mean = np.array(data["mean"], dtype=np.float64)
+        stats.m2 = np.array(data["m2"], dtype=np.float64)
+        stats.histogram = np.array(data["histogram"], dtype=np.int64)
+        stats.resolutions = dict(data["resolutions"])
+        return stats
+
+
+def image_stats(path: str) -> ChannelStats:
+    stats = ChannelStats()
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None:
+        logging.error(f"Could not read {path}")
+    else:
+        stats.update(img)
+    return stats
+
+
+class DatasetStatistics:
+    """
+    Streaming, incremental image statistics for a warehouse object.
+
+    Statistics are kept per (split, label, angle) group in
+    data_warehouse/distribution/<object_name>.json together with the size and mtime
+    of every file they cover. update() only decodes files that are new since the
+    last run. A group is recomputed from scratch only when one of its files was
+    changed or removed. Totals per split, label, angle and for the whole object are
+    merged from the group accumulators.
+
+    :param object_name: Name of the object in the data warehouse.
+    :param output_dir: Directory for the JSON file. Defaults to data_warehouse/distribution.
+    :param workers: Number of decode processes. None uses all CPUs, 1 decodes in the
+        calling process.
+
+    Example:
+        summary = DatasetStatistics("apple").update()
+        summary["splits"]["train"]["mean"]
+    """
+
+    def __init__(
+        self,
+        object_name: str,
+        output_dir: Optional[str] = None,
+        workers: Optional[int] = 1,
+    ) -> None:
+        self.object_name = object_name.replace(" ", "_")
+        base_dir = os.path.join(os.getcwd(), "data_warehouse")
+        self.object_dir = os.path.join(base_dir, "dataset", self.object_name)
+        self.output_dir = output_dir or os.path.join(base_dir, "distribution")
+        self.path = os.path.join(self.output_dir, f"{self.object_name}.json")
+        self.workers = workers
+        self.groups = self.load()
+
+    def load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        return {
+            key: {
+                "files": group["files"],
+                "stats": ChannelStats.from_dict(group["stats"]),
+            }
+            for key, group in data["groups"].items()
+        }
+
+    def save(self) -> dict:
+        summary = self.summary()
+        os.makedirs(self.output_dir, exist_ok=True)
+        data = dict(summary)
+        data["groups"] = {
+            key: {"files": group["files"], "stats": group["stats"].to_dict()}
+            for key, group in sorted(self.groups.items())
+        }
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(data, f, indent=4)
+        os.replace(self.path + ".tmp", self.path)
+        return summary
+
+    def scan(self) -> Dict[str, Dict[str, list]]:
+        """Return {"split/label/angle": {relative path: [size, mtime]}} from disk."""
+        groups = {}
+        for record in iter_dataset_images(self.object_dir):
+            key = "/".join((record["split"], record["label"], record["angle"]))
+            rel = record["path"].replace(os.sep, "/")
+            groups.setdefault(key, {})[rel] = [record["size"], record["mtime"]]
+        return groups
+
+    def _compute(self, paths: List[str]) -> Iterable[ChannelStats]:
+        full_paths = [os.path.join(self.object_dir, *rel.split("/")) for rel in paths]
+        workers = self.workers or os.cpu_count() or 1
+        if workers > 1 and len(full_paths) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                yield from executor.map(image_stats, full_paths, chunksize=16)
+        else:
+            yield from map(image_stats, full_paths)
+
+    def update(self) -> dict:
+        """
+        Bring the statistics up to date with the files on disk and save them.
+
+        :return: The summary, see summary().
+        """
+        on_disk = self.scan()
+        for key in set(self.groups) - set(on_disk):
+            del self.groups[key]
+
+        jobs = []
+        for key, files in sorted(on_disk.items()):
+            group = self.groups.get(key)
+            known = group["files"] if group else {}
+            stale = any(files.get(rel) != entry for rel, entry in known.items())
+            if group is None or stale:
+                if stale:
+                    logging.info(f"Statistics for {key} are stale, recomputing")
+                group = self.groups[key] = {"files": {}, "stats": ChannelStats()}
+            new = sorted(rel for rel in files if rel not in group["files"])
+            jobs.extend((key, rel) for rel in new)
+            group["files"].update({rel: files[rel] for rel in new})
+
+        for (key, _), stats in zip(jobs, self._compute([rel for _, rel in jobs])):
+            self.groups[key]["stats"].merge(stats)
+
+        print(f"Updated statistics with {len(jobs)} images in {self.path}")
+        return self.save()
+
+    def summary(self) -> dict:
+        """
+        Merged statistics for the whole object and per split, label and angle.
+
+        :return: {"object", "channels", "total", "splits", "labels", "angles"}
+        """
+        totals = {"splits": {}, "labels": {}, "angles": {}}
+        total = ChannelStats()
+        for key, group in self.groups.items():
+            split, label, angle = key.split("/")
+            for level, name in (("splits", split), ("labels", label), ("angles", angle)):
+                totals[level].setdefault(name, ChannelStats()).merge(group["stats"])
+            total.merge(group["stats"])
+        summary = {"object": self.object_name, "channels": "BGR"}
+        summary["total"] = total.to_dict()
+        for level, stats in totals.items():
+            summary[level] = {
+                name: stats[name].to_dict() for name in sorted(stats)
+            }
+        return summary
@@ -0,0 +1,97 @@
+import logging
+import os
+import random
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .utils import allowed_file
+
+
+class TextureLibrary:
+    """
+    In-memory texture library for DataAugmenter.random_texture_overlay.
+
+    Every texture is decoded from disk once and resized once per target resolution.
+    Decoded and resized textures share a size-bounded LRU cache, so overlays at a
+    resolution that has been seen before never read from disk or resize.
+
+    :param directory: Directory with texture images (png, jpg, jpeg).
+    :param max_bytes: Upper bound for the memory held by the cache.
+
+    Example:
+        textures = TextureLibrary("textures", max_bytes=128 * 2**20)
+        textures.preload([(480, 640)])
+        augmenter = DataAugmenter("apple", textures=textures)
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 2**20) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.names = sorted(f for f in os.listdir(directory) if allowed_file(f))
+        self.cache: OrderedDict = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_reads = 0
+        self.resizes = 0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _insert(self, key, texture: np.ndarray) -> None:
+        if texture.nbytes > self.max_bytes:
+            logging.warning(f"Texture {key[0]} is larger than the cache budget")
+            return
+        self.cache[key] = texture
+        self.nbytes += texture.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.cache.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def _original(self, name: str) -> np.ndarray:
+        key = (name, None)
+        texture = self.cache.get(key)
+        if texture is not None:
+            self.cache.move_to_end(key)
+            return texture
+        texture = cv2.imread(os.path.join(self.directory, name), cv2.IMREAD_COLOR)
+        if texture is None:
+            raise ValueError(f"Could not read texture {name}")
+        self.disk_reads += 1
+        self._insert(key, texture)
+        return texture
+
+    def get(self, name: str, shape: Tuple[int, int]) -> np.ndarray:
+        """Return texture name resized to shape (height, width)."""
+        key = (name, tuple(shape[:2]))
+        texture = self.cache.get(key)
+        if texture is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return texture
+        height, width = shape[:2]
+        texture = cv2.resize(
+            self._original(name), (width, height), interpolation=cv2.INTER_AREA
+        )
+        self.resizes += 1
+        self._insert(key, texture)
+        return texture
+
+    def random(self, shape: Tuple[int, int]) -> Optional[np.ndarray]:
+        if not self.names:
+            return None
+        return self.get(random.choice(self.names), shape)
+
+    def preload(self, resolutions: Iterable[Tuple[int, int]]) -> None:
+        """
+        Decode every texture once and resize it to each (height, width).
+
+        The decoded originals stay cached too, so a resolution that was not
+        preloaded is resized from memory. Only cache evictions cause disk reads.
+        """
+        resolutions = [tuple(res) for res in resolutions]
+        for name in self.names:
+            for resolution in resolutions:
+                self.get(name, resolution)
@@ -0,0 +1,134 @@
+import os
+from typing import Callable, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Upper bound for the temporary bytes per pixel of a tiled op. Building the
+# remap maps of a strip (float32 radii, scales and coordinates plus the fixed-point
+# maps) is the largest.
+TILE_BYTES_PER_PIXEL = 32
+
+
+def strip_ranges(height: int, rows: int) -> Iterator[Tuple[int, int]]:
+    """Yield (y0, y1) row ranges of at most rows rows covering 0..height."""
+    for y0 in range(0, height, max(1, rows)):
+        yield y0, min(height, y0 + rows)
+
+
+def rows_for_budget(width: int, memory_budget: int) -> int:
+    """Number of rows whose op temporaries fit in memory_budget bytes."""
+    return max(1, memory_budget // (width * TILE_BYTES_PER_PIXEL))
+
+
+def gaussian_kernel_radius(sigma: float, dtype) -> int:
+    """Radius of the kernel cv2.GaussianBlur derives from sigma for ksize (0, 0)."""
+    scale = 3 if np.dtype(dtype) == np.uint8 else 4
+    return (int(round(sigma * scale * 2 + 1)) | 1) // 2
+
+
+def gaussian_blur_tiled(
+    img: np.ndarray,
+    sigma: float,
+    dst: np.ndarray,
+    rows: int,
+    scratch: Optional[Callable] = None,
+) -> np.ndarray:
+    """
+    cv2.GaussianBlur(img, (0, 0), sigma) computed in strips of rows rows.
+
+    Each strip is blurred together with a halo of kernel-radius rows on both sides,
+    so interior strip edges see their true neighbours and the result matches the
+    whole-frame blur exactly. Borders of the image are extrapolated as usual.
+
+    :param scratch: Optional function (shape, dtype) -> buffer for the halo strips.
+    """
+    height = img.shape[0]
+    halo = gaussian_kernel_radius(sigma, img.dtype)
+    for y0, y1 in strip_ranges(height, rows):
+        top, bottom = max(0, y0 - halo), min(height, y1 + halo)
+        shape = (bottom - top,) + img.shape[1:]
+        out = scratch(shape, img.dtype) if scratch else None
+        out = cv2.GaussianBlur(img[top:bottom], (0, 0), sigma, dst=out)
+        dst[y0:y1] = out[y0 - top : y1 - top]
+    return dst
+
+
+def remap_tiled(
+    img: np.ndarray,
+    maps_for_rows: Callable[[int, int], Tuple[np.ndarray, np.ndarray]],
+    dst: np.ndarray,
+    rows: int,
+    interpolation: int = cv2.INTER_LINEAR,
+    border_mode: int = cv2.BORDER_CONSTANT,
+) -> np.ndarray:
+    """
+    cv2.remap with maps built one strip at a time.
+
+    maps_for_rows(y0, y1) returns the remap maps of output rows y0..y1. Only one
+    strip of maps exists at a time and each output row only depends on its own map
+    row, so the result matches a whole-frame remap exactly.
+    """
+    for y0, y1 in strip_ranges(img.shape[0], rows):
+        map1, map2 = maps_for_rows(y0, y1)
+        cv2.remap(
+            img, map1, map2, interpolation, dst=dst[y0:y1], borderMode=border_mode
+        )
+    return dst
+
+
+def available_memory() -> Optional[int]:
+    """
+    Bytes of memory available to this process, or None if unknown.
+
+    The smaller of MemAvailable in /proc/meminfo and the remaining cgroup limit,
+    so container limits are respected.
+    """
+    candidates = []
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    candidates.append(int(line.split()[1]) * 1024)
+                    break
+    except OSError:
+        pass
+
+    for limit_file, usage_file in (
+        ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+        (
+            "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+            "/sys/fs/cgroup/memory/memory.usage_in_bytes",
+        ),
+    ):
+        try:
+            with open(limit_file, "r") as f:
+                limit = f.read().strip()
+            with open(usage_file, "r") as f:
+                usage = int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        if limit.isdigit() and int(limit) < 2**60:
+            candidates.append(max(0, int(limit) - usage))
+        break
+    return min(candidates) if candidates else None
+
+
+def workers_for_memory(
+    per_worker_bytes: int,
+    max_workers: Optional[int] = None,
+    memory_budget: Optional[int] = None,
+) -> int:
+    """
+    Number of workers that fit in memory_budget, between 1 and max_workers.
+
+    :param per_worker_bytes: Peak memory of one worker.
+    :param max_workers: Upper bound. Defaults to the number of CPUs.
+    :param memory_budget: Bytes to stay within. Defaults to available_memory().
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    if memory_budget is None:
+        memory_budget = available_memory()
+    if memory_budget is None or per_worker_bytes <= 0:
+        return max_workers
+    return max(1, min(max_workers, memory_budget // per_worker_bytes))
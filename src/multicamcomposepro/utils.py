@@ -1,6 +1,8 @@
+import hashlib
 import json
 import os
 import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from platform import system
 from typing import List, Optional, Union
 
@@ -9,6 +11,8 @@ import numpy as np
 from PIL import Image
 from tqdm import tqdm
 
+from .tiling import workers_for_memory
+
 
 def view_camera(camera_index=0):
     cap = wcap(camera_index)
@@ -48,24 +52,73 @@ VALID_RESOLUTIONS = ["400 x 400", "640 x 480", "800 x 640", "800 x 800"]
 
 
 class CameraConfigurator:
-    def __init__(self, n_cameras: int = 10):
+    """
+    Identify connected cameras and save their settings to camera_config.json.
+
+    :param n_cameras: Number of camera indices to probe.
+    :param reconfigure: Whether to overwrite an existing camera_config.json. If None,
+        the user is asked.
+    :param cameras: Settings per camera index, as keyword arguments of
+        configure_camera(). If given, no camera windows are opened and nothing is
+        asked, so the configuration can be scripted.
+    """
+
+    def __init__(
+        self,
+        n_cameras: int = 10,
+        reconfigure: Optional[bool] = None,
+        cameras: Optional[dict] = None,
+    ):
         self.max_usb_connection: int = n_cameras
         self.camera_mapping: dict = {}
         self.camera_settings: dict = {}
+        self.reconfigure = reconfigure
+        self.cameras = cameras
         self.init()
 
     def init(self):
         if os.path.exists("camera_config.json"):
-            reconfigure = input(
-                "Do you want to reconfigure existing camera config? [Y/N] "
-            )
-            if reconfigure.lower() not in ["y", "yes"]:
+            reconfigure = self.reconfigure
+            if reconfigure is None:
+                reconfigure = input(
+                    "Do you want to reconfigure existing camera config? [Y/N] "
+                ).lower() in ["y", "yes"]
+            if not reconfigure:
                 print("CameraManager cancelled.")
                 return
         print("Running CameraManager...")
-        self.identify_and_configure_all_cameras()
+        if self.cameras is not None:
+            for cam_idx, settings in self.cameras.items():
+                self.configure_camera(cam_idx, **settings)
+        else:
+            self.identify_and_configure_all_cameras()
         self.save_to_json()
 
+    def configure_camera(
+        self,
+        cam_idx: int,
+        angle: str,
+        resolution: str = "400 x 400",
+        exposure: int = 0,
+        color_temp: int = 3000,
+    ) -> None:
+        """Validate and store the settings of one camera."""
+        if angle.lower() not in [valid.lower() for valid in VALID_ANGLES]:
+            raise ValueError(
+                f"Invalid angle '{angle}', expected one of {', '.join(VALID_ANGLES)}"
+            )
+        if resolution.lower() not in [res.lower() for res in VALID_RESOLUTIONS]:
+            raise ValueError(
+                f"Invalid resolution '{resolution}', expected one of "
+                f"{', '.join(VALID_RESOLUTIONS)}"
+            )
+        self.camera_settings[cam_idx] = {
+            "Angle": angle.lower().capitalize(),
+            "Resolution": resolution.lower(),
+            "Camera Exposure": int(exposure),
+            "Camera Color Temperature": int(color_temp),
+        }
+
     def identify_and_configure_all_cameras(self) -> None:
         # Iterate over all accessible cameras
         for i in range(self.max_usb_connection):
@@ -125,12 +178,9 @@ class CameraConfigurator:
                         resolution = "400 x 400"  # default value
 
                     # Store the settings
-                    self.camera_settings[i] = {
-                        "Angle": camera_angle.capitalize(),
-                        "Resolution": resolution,
-                        "Camera Exposure": exposure,
-                        "Camera Color Temperature": color_temp,
-                    }
+                    self.configure_camera(
+                        i, camera_angle, resolution, exposure, color_temp
+                    )
 
                     # Break out of the camera stream loop after configuration
                     break
@@ -166,6 +216,21 @@ class Warehouse:
         self.created_nested_sub_dirs: List[str] = []
         self.object_name: str = str()
         self.anomalies: List[str] = []  # Used in camera.py
+        self._catalog = None
+
+    @property
+    def catalog(self):
+        """
+        Catalog of every image in the data warehouse, opened on first use.
+        See catalog.Catalog.
+        """
+        if self._catalog is None:
+            from .catalog import Catalog  # catalog.py imports this module
+
+            base_dir_path = os.path.join(os.getcwd(), "data_warehouse")
+            os.makedirs(base_dir_path, exist_ok=True)
+            self._catalog = Catalog(os.path.join(base_dir_path, "catalog.sqlite"))
+        return self._catalog
 
     def clean_folder_name(self, folder_name: str) -> str:
         cleaned_name = folder_name.replace(" ", "_")
@@ -244,11 +309,119 @@ def allowed_file(filename, allowed_extensions=("png", "jpg", "jpeg")):
     return ext in allowed_extensions
 
 
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    Return the hex SHA-256 digest of a file's contents, read in chunks.
+
+    Parameters:
+        path (str): Path to the file.
+        chunk_size (int): Number of bytes read per chunk.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def center_crop_box(width, height):
+    """Return the (left, upper, right, lower) box of the centred square crop."""
+    # Crop horizontally if crop size ratio mismatch #TODO crop vertical maybe
+    if width > height:
+        left = (width - height) // 2
+        return (left, 0, width - left, height)
+    if height > width:
+        upper = (height - width) // 2
+        return (0, upper, width, height - upper)
+    return (0, 0, width, height)
+
+
+def resize_memory(path, target_size):
+    """
+    Rough peak bytes resize_image_file needs for one image: the decoded source
+    after draft reduction plus the reduced copy made before the final resample.
+    """
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            channels = len(img.getbands())
+    except OSError:
+        return 0  # Unreadable, fails and is reported when it is resized
+    reduce = max(1, min(width, height) // (2 * max(target_size)))
+    return 2 * (width // reduce) * (height // reduce) * channels
+
+
+def resize_image_file(
+    input_path, output_path, target_size, overwrite_original=False, read_path=None
+):
+    """
+    Centre crop and resize one image file. Used by batch_resize.
+
+    Sources at least twice as large as the target are decoded at reduced size where
+    the format allows it (JPEG DCT scaling through Image.draft) and downscaled with
+    a cheap integer reduce before the final resample (reducing_gap).
+
+    read_path, if given, is decoded instead of input_path, e.g. a cached pyramid
+    level of it.
+    """
+    with Image.open(read_path or input_path) as img:
+        width, height = img.size
+        reduce = min(width, height) // (2 * max(target_size))
+        if reduce >= 2:
+            img.draft(img.mode, (width // reduce, height // reduce))
+        width, height = img.size
+        img_resized = img.resize(
+            target_size, box=center_crop_box(width, height), reducing_gap=2.0
+        )
+        img_resized.save(output_path)
+
+    if overwrite_original:
+        os.remove(input_path)
+    return output_path
+
+
 def batch_resize(
-    root_input_dir, root_output_dir, target_size=(224, 224), overwrite_original=False
+    root_input_dir,
+    root_output_dir,
+    target_size=(224, 224),
+    overwrite_original=False,
+    workers=1,
+    catalog=None,
+    pyramid=None,
+    memory_budget=None,
+    memory_sample=32,
 ):
-    n = 0
-    for dirpath, dirnames, filenames in os.walk(root_input_dir):
+    """
+    Centre crop and resize every image below root_input_dir into root_output_dir,
+    keeping the directory structure.
+
+    :param workers: Number of worker processes. None uses all CPUs, 1 resizes in
+        the calling process.
+    :param catalog: Optional Catalog. Input files are then listed from the catalog
+        instead of walking root_input_dir.
+    :param pyramid: Optional pyramid.PyramidCache. Each image is then resized from
+        the smallest cached level that still covers target_size.
+    :param memory_budget: Bytes the worker processes may use together. Defaults to
+        the memory available to this process (cgroup limits included). The number
+        of workers is lowered so that workers times the largest per-image estimate
+        of up to memory_sample sources fits. Resizing itself is not tiled: PIL
+        decodes the whole frame (JPEG at draft-reduced size) before resampling, so
+        strips would not lower the peak. A frame larger than the budget still runs,
+        in a single worker.
+    """
+    if catalog is not None:
+        listing = {}
+        for path in catalog.paths_under(root_input_dir):
+            dirpath, filename = os.path.split(path)
+            listing.setdefault(dirpath, []).append(filename)
+        walk = sorted(listing.items())
+    else:
+        walk = (
+            (dirpath, filenames) for dirpath, _, filenames in os.walk(root_input_dir)
+        )
+
+    jobs = []
+    for dirpath, filenames in walk:
         relative_dir = os.path.relpath(dirpath, root_input_dir)
 
         if not any(allowed_file(filename) for filename in filenames):
@@ -257,7 +430,7 @@ def batch_resize(
         output_subdir = os.path.join(root_output_dir, relative_dir)
         os.makedirs(output_subdir, exist_ok=True)
 
-        for filename in tqdm(filenames, desc=f"Processing image"):
+        for filename in filenames:
             if not allowed_file(filename):
                 tqdm.write(f"File type not allowed for {filename}")
                 continue
@@ -271,26 +444,45 @@ def batch_resize(
                 )
                 continue
 
-            # Crop horizontally if crop size ratio mismatch #TODO crop vertical maybe
-            with Image.open(input_path) as img:
-                width, height = img.size
-                if width > height:
-                    left = (width - height) // 2
-                    right = width - left
-                    img = img.crop((left, 0, right, height))
-                elif height > width:
-                    upper = (height - width) // 2
-                    lower = height - upper
-                    img = img.crop((0, upper, width, lower))
-                img_resized = img.resize(target_size)
-                img_resized.save(output_path)
-
-            if overwrite_original:
-                os.remove(input_path)
-
-            n += 1
+            jobs.append((input_path, output_path, target_size, overwrite_original))
+
+    n = 0
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if pyramid is not None:
+        pyramid.update([job[0] for job in jobs], workers=workers)
+        jobs = [job + (pyramid.get(job[0], max(target_size)),) for job in jobs]
+
+    if workers > 1 and jobs:
+        step = max(1, len(jobs) // memory_sample)
+        per_worker = max(
+            resize_memory(job[-1] if pyramid is not None else job[0], target_size)
+            for job in jobs[::step]
+        )
+        workers = workers_for_memory(per_worker, workers, memory_budget)
+
+    if workers <= 1:
+        for job in tqdm(jobs, desc="Processing image"):
+            try:
+                resize_image_file(*job)
+                n += 1
+            except Exception as e:
+                tqdm.write(f"Could not resize {job[0]}: {e}")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(resize_image_file, *job): job for job in jobs}
+            for future in tqdm(
+                as_completed(futures), total=len(futures), desc="Processing image"
+            ):
+                try:
+                    future.result()
+                    n += 1
+                except Exception as e:
+                    tqdm.write(f"Could not resize {futures[future][0]}: {e}")
 
     print(f"Finished resize of {n} images with new resolution: {target_size}")
+    return n
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_arrays.py
+# For Windows: $ python -m pytest tests/test_arrays.py
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from src.multicamcomposepro.arrays import ArrayLoader
+from src.multicamcomposepro.utils import Warehouse
+
+
+def write_image(path, value, shape=(30, 40, 3)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(path), np.full(shape, value, np.uint8))
+    return str(path)
+
+
+@pytest.fixture
+def front_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    front_dir = (
+        tmp_path / "data_warehouse" / "dataset" / "apple" / "train" / "good" / "Front"
+    )
+    for i in range(3):
+        write_image(front_dir / f"{i:03d}.png", i * 10)
+    return front_dir
+
+
+# Test 1: Test Group Is Materialised Once And Memory Mapped
+def test_load(front_dir):
+    loader = ArrayLoader("apple")
+    images, meta = loader.load("train", "good", "Front")
+    assert isinstance(images, np.memmap)
+    assert images.shape == (3, 30, 40, 3)
+    assert images[2, 0, 0, 0] == 20
+    assert meta["paths"][0] == "train/good/Front/000.png"
+
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr(loader, "materialise", lambda *args: pytest.fail("rebuilt"))
+        again, _ = loader.load("train", "good", "Front")
+    np.testing.assert_array_equal(images, again)
+
+
+# Test 2: Test Changes Invalidate The Array
+def test_invalidation(front_dir):
+    loader = ArrayLoader("apple", image_size=(8, 8))
+    loader.load("train", "good", "Front")
+
+    write_image(front_dir / "003.png", 255, shape=(50, 50, 3))
+    images, meta = loader.load("train", "good", "Front")
+    assert images.shape == (4, 8, 8, 3)
+    assert images[3, 0, 0, 0] == 255
+
+    os.remove(front_dir / "000.png")
+    images, _ = loader.load("train", "good", "Front")
+    assert images.shape[0] == 3
+
+
+# Test 3: Test Listing From The Catalog
+def test_load_with_catalog(front_dir):
+    warehouse = Warehouse()
+    warehouse.catalog.add(str(front_dir / "001.png"))
+    images, meta = ArrayLoader("apple", catalog=warehouse.catalog).load(
+        "train", "good", "Front"
+    )
+    assert meta["paths"] == ["train/good/Front/001.png"]
+    assert images[0, 0, 0, 0] == 10
+
+
+# Test 4: Test Deleted, Unreadable And Unknown Files
+def test_missing_and_unreadable(front_dir):
+    warehouse = Warehouse()
+    for i in range(3):
+        warehouse.catalog.add(str(front_dir / f"{i:03d}.png"))
+    loader = ArrayLoader("apple", catalog=warehouse.catalog)
+    loader.load("train", "good", "Front")
+
+    os.remove(front_dir / "001.png")
+    images, meta = loader.load("train", "good", "Front")
+    assert meta["paths"] == ["train/good/Front/000.png", "train/good/Front/002.png"]
+    assert images.shape[0] == 2
+
+    (front_dir / "000.png").write_bytes(b"not an image")
+    images, meta = ArrayLoader("apple").load("train", "good", "Front")
+    assert meta["paths"] == ["train/good/Front/002.png"]
+    assert images.shape == (1, 30, 40, 3) and images[0, 0, 0, 0] == 20
+
+    with pytest.raises(KeyError):
+        loader.load("train", "good", "Back")
+    assert not os.path.exists(os.path.join(loader.cache_dir, "train_good_Back.npy"))
@@ -0,0 +1,144 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_async_camera.py
+# For Windows: $ python -m pytest tests/test_async_camera.py
+
+import asyncio
+import os
+import threading
+import time
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from src.multicamcomposepro.async_camera import AsyncCameraManager
+from src.multicamcomposepro.camera import CameraManager
+from src.multicamcomposepro.utils import Warehouse
+
+
+class FakeCapture:
+    def __init__(self, value, delay=0.0):
+        self.value = value
+        self.delay = delay
+        self.reads = 0
+
+    def read(self):
+        time.sleep(self.delay)
+        self.reads += 1
+        return True, np.full((8, 8, 3), self.value, np.uint8)
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    warehouse = Mock(spec=Warehouse)
+    warehouse.object_name = "apple"
+    warehouse.anomalies = ["scratch"]
+    warehouse.clean_folder_name.side_effect = lambda name: name.replace(" ", "_")
+    manager = CameraManager(warehouse, test_anomaly_images=1, train_images=2)
+    manager.camera_angles = ["Front", "skip", "Left"]
+    captures = [FakeCapture(10), FakeCapture(20), FakeCapture(30)]
+    manager.captures = list(captures)
+    manager.camera_config = [{"Camera": i} for i in range(3)]
+    manager.open_camera = lambda camera: captures[camera["Camera"]]
+    return manager
+
+
+# Test 1: Test Capture Set Reads All Cameras And Skips Unused Angles
+def test_capture_set(manager, tmp_path):
+    async def main():
+        async with AsyncCameraManager(manager) as rig:
+            return await rig.capture_set(str(tmp_path / "set"), 0)
+
+    filenames = asyncio.run(main())
+    assert sorted(os.path.relpath(f, tmp_path) for f in filenames) == [
+        os.path.join("set", "Front", "000.png"),
+        os.path.join("set", "Left", "000.png"),
+    ]
+    assert manager.captures[1].reads == 0
+
+
+# Test 2: Test Run Waits For The Trigger Before Every Set
+def test_run_with_trigger(manager):
+    async def main():
+        async with AsyncCameraManager(manager) as rig:
+            trigger = asyncio.Event()
+            task = asyncio.create_task(rig.run(trigger))
+            await asyncio.sleep(0.05)
+            assert manager.captures[0].reads == 0
+            for _ in range(4):  # 2 train, 1 test good, 1 anomaly set
+                trigger.set()
+                while trigger.is_set():
+                    await asyncio.sleep(0.01)
+            return await asyncio.wait_for(task, 5)
+
+    filenames = asyncio.run(main())
+    assert len(filenames) == 8
+    assert os.path.exists(
+        os.path.join(
+            "data_warehouse", "dataset", "apple", "test", "scratch", "Left", "000.png"
+        )
+    )
+
+
+# Test 3: Test Slow Cameras Time Out And Streams Can Be Cancelled
+def test_timeout_and_frames(manager):
+    manager.captures[0] = FakeCapture(10, delay=0.2)
+
+    async def main():
+        async with AsyncCameraManager(manager, timeout=0.1) as rig:
+            with pytest.raises(asyncio.TimeoutError):
+                await rig.read_frame(0)
+
+            frames = [frame async for frame in rig.frames(2, max_frames=3)]
+            assert len(frames) == 3 and frames[0][0, 0, 0] == 30
+
+            async def consume():
+                async for _ in rig.frames(2):
+                    pass
+
+            task = asyncio.create_task(consume())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(main())
+
+
+# Test 4: Test Cameras Open On Their Own Threads And Stay Busy After A Timeout
+def test_open_and_busy_camera(manager):
+    threads = []
+
+    def open_camera(camera):
+        threads.append(threading.current_thread().name)
+        time.sleep(0.05)
+        return FakeCapture(camera["Camera"], delay=0.3 if camera["Camera"] == 0 else 0)
+
+    manager.open_camera = open_camera
+
+    async def main():
+        async with AsyncCameraManager(manager, timeout=1.0) as rig:
+            start = time.perf_counter()
+            await rig.initialize_cameras()
+            assert time.perf_counter() - start < 0.12
+            assert len(set(threads)) == 3
+            assert [cap.value for cap in manager.captures] == [0, 1, 2]
+
+            rig.timeout = 0.1
+            with pytest.raises(asyncio.TimeoutError):
+                await rig.read_frame(0, flush=0)
+            start = time.perf_counter()
+            with pytest.raises(asyncio.TimeoutError, match="still busy"):
+                await rig.read_frame(0)
+            assert time.perf_counter() - start < 0.05
+            assert (await rig.read_frame(2, flush=0))[0, 0, 0] == 2
+
+            await asyncio.sleep(0.4)  # The stuck read returns
+            rig.timeout = 1.0
+            assert (await rig.read_frame(0, flush=0))[0, 0, 0] == 0
+
+    asyncio.run(main())
@@ -11,6 +11,7 @@ import numpy as np
 import pytest
 
 from src.multicamcomposepro.augment import DataAugmenter
+from src.multicamcomposepro.distortion import RemapCache
 
 
 @pytest.fixture
@@ -84,3 +85,170 @@ def test_image_sizes(data_augmenter):
 
             # Assert that cv2.imwrite was called (optional)
             mock_imwrite.assert_called()
+
+
+@pytest.fixture
+def warehouse_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    angle_dir = tmp_path / "data_warehouse" / "dataset" / "object_name" / "train" / "good" / "Front"
+    angle_dir.mkdir(parents=True)
+    img = np.random.RandomState(0).randint(0, 255, (40, 60, 3), dtype=np.uint8)
+    cv2.imwrite(str(angle_dir / "000.png"), img)
+    return angle_dir
+
+
+# Test 6: Test Incremental Augmentation
+def test_augment_images_incremental(warehouse_dir):
+    augmenter = DataAugmenter(logging_enabled=False, seed=1)
+    augmenter.augment_images()
+    assert sorted(os.listdir(warehouse_dir)) == [
+        "000.png", "000_aug_0.png", "000_aug_1.png", "000_aug_2.png"
+    ]
+
+    with patch.object(augmenter, "process_image") as mock_process:
+        augmenter.augment_images()
+        mock_process.assert_not_called()
+
+    augmenter.temperature = 2.0
+    with patch.object(augmenter, "process_image", return_value=[]) as mock_process:
+        augmenter.augment_images()
+        mock_process.assert_called_once()
+
+
+# Test 7: Test Removal Only Touches Manifest Outputs
+def test_remove_augmented_files(warehouse_dir):
+    cv2.imwrite(str(warehouse_dir / "august.png"), np.zeros((4, 4, 3), np.uint8))
+    DataAugmenter(logging_enabled=False, num_augmented_images=2).augment_images(["000.png"])
+    DataAugmenter.remove_augmented_files("object_name")
+    assert sorted(os.listdir(warehouse_dir)) == ["000.png", "august.png"]
+
+
+# Test 8: Test Ops Preserve dtype And Reuse Scratch Buffers
+def test_ops_preserve_dtype(data_augmenter):
+    img = np.full((50, 80, 3), 200, dtype=np.uint8)
+    data_augmenter.temperature = 5.0
+    exposed, factor = data_augmenter.random_exposure(img, dst=data_augmenter.swap_buffer(img))
+    assert exposed.dtype == np.uint8
+    assert exposed.max() <= 255
+
+    outputs = []
+    with patch("cv2.imwrite", side_effect=lambda path, out: outputs.append(out)):
+        data_augmenter.process_image(img, "a.png", "./")
+        data_augmenter.process_image(img.copy(), "b.png", "./")
+    assert all(out.dtype == np.uint8 for out in outputs)
+    buffers = {id(buf) for buf in data_augmenter._buffers.values()}
+    assert all(id(out) in buffers for out in outputs)
+
+
+# Test 9: Test Random Crop Returns A View
+def test_random_crop(data_augmenter):
+    img = np.zeros((100, 200, 3), dtype=np.uint8)
+    cropped, (x, y, w, h) = data_augmenter.random_crop(
+        img, scale_range=(0.5, 0.5), resize=False
+    )
+    assert cropped.shape == (50, 100, 3)
+    assert np.shares_memory(cropped, img)
+
+    dst = np.empty_like(img)
+    resized, _ = data_augmenter.random_crop(img, dst=dst, resize=True)
+    assert resized is dst
+
+    # Chained iterations keep the source resolution
+    augmenter = DataAugmenter(logging_enabled=False, pipeline={"ops": [{"op": "crop"}]})
+    with patch("cv2.imwrite") as mock_imwrite:
+        augmenter.process_image(img, "a.png", "./")
+    assert [call.args[1].shape for call in mock_imwrite.call_args_list] == [
+        img.shape
+    ] * 3
+
+
+# Test 10: Test Texture Overlay Uses The Texture Cache
+def test_random_texture_overlay(tmp_path):
+    from src.multicamcomposepro.textures import TextureLibrary
+
+    cv2.imwrite(str(tmp_path / "wood.png"), np.full((30, 30, 3), 255, np.uint8))
+    textures = TextureLibrary(str(tmp_path))
+    textures.preload([(40, 60)])
+    augmenter = DataAugmenter(logging_enabled=False, textures=textures)
+
+    img = np.zeros((40, 60, 3), dtype=np.uint8)
+    for _ in range(3):
+        out, alpha = augmenter.random_texture_overlay(img, alpha_range=(0.5, 0.5))
+    assert out.shape == img.shape
+    assert out.dtype == np.uint8
+    assert out[0, 0, 0] in (127, 128)
+    assert textures.disk_reads == 1
+    assert textures.resizes == 1
+    assert textures.hits == 3
+
+    # Resolutions that were not preloaded are resized from the cached original
+    textures.get("wood.png", (20, 20))
+    assert textures.disk_reads == 1
+
+
+# Test 11: Test Grouped Augmentation Shares Photometric Parameters
+def test_augment_images_grouped(warehouse_dir):
+    left_dir = warehouse_dir.parent / "Left"
+    left_dir.mkdir()
+    cv2.imwrite(str(left_dir / "000.png"), cv2.imread(str(warehouse_dir / "000.png")))
+
+    augmenter = DataAugmenter(
+        logging_enabled=False,
+        grouped=True,
+        pipeline={"ops": [{"op": "white_balance"}, {"op": "exposure"}]},
+    )
+    with patch.object(
+        augmenter, "process_group", wraps=augmenter.process_group
+    ) as mock_group:
+        augmenter.augment_images()
+        assert mock_group.call_count == 1
+
+    for i in range(3):
+        front = cv2.imread(str(warehouse_dir / f"000_aug_{i}.png"))
+        left = cv2.imread(str(left_dir / f"000_aug_{i}.png"))
+        np.testing.assert_array_equal(front, left)
+
+
+# Test 12: Test Grouped Geometric Ops Run Per View
+def test_process_group_geometric(data_augmenter):
+    images = [np.full((20, 30, 3), 100, np.uint8), np.full((20, 30, 3), 50, np.uint8)]
+    with patch("cv2.imwrite") as mock_imwrite:
+        outputs = data_augmenter.process_group(images, ["a.png", "a.png"], ["F", "L"])
+    assert outputs == [["a_aug_0.png", "a_aug_1.png", "a_aug_2.png"]] * 2
+    assert mock_imwrite.call_count == 6
+    assert images[0][0, 0, 0] == 100  # Inputs are not modified
+
+
+# Test 13: Test Lens Distortion Reuses Cached Remap Tables
+def test_random_lens_distortion(data_augmenter):
+    img = np.random.RandomState(0).randint(0, 255, (60, 80, 3), dtype=np.uint8)
+    for _ in range(20):
+        out, (k1, k2) = data_augmenter.random_lens_distortion(
+            img, k1_range=(0.1, 0.104), k2_range=(0.0, 0.001)
+        )
+    assert out.shape == img.shape
+    assert out.dtype == np.uint8
+    assert (k1, k2) == (0.1, 0.0)
+    assert data_augmenter.remap_cache.misses == 1
+    assert data_augmenter.remap_cache.hits == 19
+
+    identity, _ = data_augmenter.random_lens_distortion(
+        img, k1_range=(0, 0), k2_range=(0, 0)
+    )
+    np.testing.assert_array_equal(identity, img)
+
+
+# Test 14: Test The Remap Cache Is Bounded By Entries And Bytes
+def test_remap_cache_bounds():
+    cache = RemapCache(max_entries=2)
+    assert cache.max_bytes > 0
+    for k1 in (0.01, 0.02, 0.01, 0.03):
+        cache.get(60, 80, k1, 0.0)
+    assert list(cache.maps) == [(60, 80, 0.01, 0.0), (60, 80, 0.03, 0.0)]
+    assert cache.hits == 1
+
+    pair = 60 * 80 * 6
+    cache = RemapCache(max_bytes=2 * pair)
+    for k1 in (0.01, 0.02, 0.03):
+        cache.get(60, 80, k1, 0.0)
+    assert len(cache) == 2 and cache.nbytes == 2 * pair
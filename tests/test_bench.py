@@ -0,0 +1,40 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_bench.py
+# For Windows: $ python -m pytest tests/test_bench.py
+
+import copy
+
+import pytest
+
+from src.multicamcomposepro import bench
+
+
+@pytest.fixture(scope="module")
+def results():
+    return bench.run_benchmarks({"tiny": (32, 48)}, repeats=1)
+
+
+# Test 1: Test Every Op And Path Is Benchmarked
+def test_run_benchmarks(results):
+    keys = set(results["results"])
+    for op in bench.BENCHMARK_OPS:
+        assert f"tiny/{op}" in keys
+    assert "tiny/process_image" in keys
+    assert "tiny/augment_images" in keys
+    metrics = results["results"]["tiny/rotation"]
+    assert metrics["images_per_s"] > 0
+    assert metrics["peak_mb"] >= 0
+
+
+# Test 2: Test Baseline Round Trip And Regression Detection
+def test_compare(results, tmp_path):
+    path = str(tmp_path / "baseline.json")
+    bench.save_baseline(results, path)
+    baseline = bench.load_baseline(path)
+    assert bench.compare(results, baseline) == []
+
+    slower = copy.deepcopy(results)
+    slower["results"]["tiny/rotation"]["images_per_s"] /= 10
+    regressions = bench.compare(slower, baseline)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("tiny/rotation")
@@ -0,0 +1,138 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_catalog.py
+# For Windows: $ python -m pytest tests/test_catalog.py
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from src.multicamcomposepro.augment import DataAugmenter
+from src.multicamcomposepro.utils import Warehouse, batch_resize
+
+
+def write_image(path, shape=(30, 40, 3)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(path), np.random.RandomState(0).randint(0, 255, shape, np.uint8))
+    return str(path)
+
+
+@pytest.fixture
+def warehouse(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    warehouse = Warehouse()
+    warehouse.build("apple", ["cracked"])
+    return warehouse
+
+
+@pytest.fixture
+def object_dir(tmp_path):
+    return tmp_path / "data_warehouse" / "dataset" / "apple"
+
+
+# Test 1: Test Adding And Querying Images
+def test_add_and_query(warehouse, object_dir):
+    catalog = warehouse.catalog
+    catalog.add(write_image(object_dir / "train" / "good" / "Front" / "000.png"))
+    catalog.add(
+        write_image(object_dir / "test" / "cracked" / "Left" / "000.png"), 40, 30
+    )
+
+    (row,) = catalog.query(split="train")
+    assert (row["object"], row["label"], row["angle"]) == ("apple", "good", "Front")
+    assert (row["width"], row["height"]) == (40, 30)
+    assert row["provenance"] == "original"
+    assert catalog.count(object="apple") == 2
+    assert catalog.count(label="cracked", angle="Left") == 1
+    assert catalog.paths(split="test") == [
+        str(object_dir / "test" / "cracked" / "Left" / "000.png")
+    ]
+
+    with pytest.raises(ValueError):
+        catalog.query(colour="red")
+
+
+# Test 2: Test Augmentation Records Provenance
+def test_augment_with_catalog(warehouse, object_dir):
+    catalog = warehouse.catalog
+    catalog.add(write_image(object_dir / "train" / "good" / "Front" / "000.png"))
+
+    DataAugmenter("apple", logging_enabled=False, catalog=catalog).augment_images()
+    augmented = catalog.query(provenance="augmented")
+    assert len(augmented) == 3
+    assert {row["source"] for row in augmented} == {"apple/train/good/Front/000.png"}
+
+    DataAugmenter.remove_augmented_files("apple", catalog)
+    assert catalog.count(provenance="augmented") == 0
+    assert catalog.count() == 1
+
+
+# Test 3: Test Verify And Rebuild
+def test_verify_and_rebuild(warehouse, object_dir):
+    catalog = warehouse.catalog
+    tracked = write_image(object_dir / "train" / "good" / "Front" / "000.png")
+    catalog.add(tracked)
+    DataAugmenter("apple", logging_enabled=False, catalog=catalog).augment_images()
+    write_image(object_dir / "test" / "good" / "Front" / "000.png")
+    os.remove(tracked)
+
+    report = catalog.verify()
+    assert report["missing"] == ["apple/train/good/Front/000.png"]
+    assert report["untracked"] == ["apple/test/good/Front/000.png"]
+
+    assert catalog.rebuild() == 4
+    assert catalog.verify() == {"missing": [], "untracked": [], "changed": []}
+    assert catalog.count(provenance="augmented") == 3
+
+
+# Test 4: Test batch_resize Lists Files From The Catalog
+def test_batch_resize_with_catalog(warehouse, object_dir, tmp_path):
+    catalog = warehouse.catalog
+    catalog.add(write_image(object_dir / "train" / "good" / "Front" / "000.png"))
+    write_image(object_dir / "train" / "good" / "Front" / "001.png")  # Not cataloged
+
+    n = batch_resize(str(object_dir), str(tmp_path / "out"), (8, 8), catalog=catalog)
+    assert n == 1
+    assert os.listdir(tmp_path / "out" / "train" / "good" / "Front") == ["000.png"]
+
+    catalog.add(write_image(object_dir / "test" / "cracked" / "Front" / "000.png"))
+    assert catalog.paths_under(str(object_dir / "train")) == [
+        str(object_dir / "train" / "good" / "Front" / "000.png")
+    ]
+    assert len(catalog.paths_under(str(object_dir))) == 2
+    assert catalog.paths_under(str(tmp_path / "elsewhere")) == []
+
+
+# Test 5: Test An Empty Or Stale Catalog Does Not Delete Augmentations
+def test_augment_with_stale_catalog(warehouse, object_dir):
+    front_dir = object_dir / "train" / "good" / "Front"
+    write_image(front_dir / "000.png")
+    write_image(front_dir / "001.png")
+    DataAugmenter("apple", logging_enabled=False).augment_images()
+    expected = sorted(os.listdir(front_dir))
+    assert len(expected) == 8
+
+    catalog = warehouse.catalog
+    DataAugmenter("apple", logging_enabled=False, catalog=catalog).augment_images()
+    assert sorted(os.listdir(front_dir)) == expected
+
+    catalog.add(str(front_dir / "000.png"))  # 001.png is not cataloged
+    DataAugmenter("apple", logging_enabled=False, catalog=catalog).augment_images()
+    assert sorted(os.listdir(front_dir)) == expected
+
+    os.remove(front_dir / "001.png")
+    DataAugmenter("apple", logging_enabled=False, catalog=catalog).augment_images()
+    assert sorted(os.listdir(front_dir)) == [
+        name for name in expected if not name.startswith("001")
+    ]
+
+
+# Test 6: Test Sync Rebuilds A Catalog That Predates The Images
+def test_sync(warehouse, object_dir):
+    catalog = warehouse.catalog
+    write_image(object_dir / "train" / "good" / "Front" / "000.png")
+    assert catalog.count() == 0
+    assert catalog.sync() is catalog
+    assert catalog.count(provenance="original") == 1
+    assert catalog.verify() == {"missing": [], "untracked": [], "changed": []}
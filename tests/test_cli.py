@@ -0,0 +1,112 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_cli.py
+# For Windows: $ python -m pytest tests/test_cli.py
+
+import json
+import os
+import subprocess
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+from src.multicamcomposepro.cli import build_parser, main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("cv2", "numpy", "PIL", "tqdm")
+
+
+# Test 1: Test Importing The CLI Is Fast And Skips Heavy Libraries
+def test_import_time():
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import src.multicamcomposepro.cli\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(elapsed, [m for m in {HEAVY_MODULES!r} if m in sys.modules])\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split(" ", 1)
+    assert output[1].strip() == "[]"
+    assert float(output[0]) < 0.5
+
+
+# Test 2: Test Help Exits Cleanly
+def test_help(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--help"])
+    assert exit_info.value.code == 0
+    out = capsys.readouterr().out
+    for command in (
+        "configure",
+        "capture",
+        "quick",
+        "augment",
+        "resize",
+        "stats",
+        "bench",
+    ):
+        assert command in out
+
+
+# Test 3: Test Non-Interactive Camera Configuration
+def test_configure(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "camera_config.json").write_text("[]")
+    assert (
+        main(
+            [
+                "configure",
+                "--yes",
+                "--camera",
+                "0:front:640x480:-5",
+                "--camera",
+                "2:Left",
+            ]
+        )
+        == 0
+    )
+    config = json.loads((tmp_path / "camera_config.json").read_text())
+    assert config[0]["Angle"] == "Front"
+    assert config[0]["Resolution"] == "640 x 480"
+    assert config[0]["Camera Exposure"] == -5
+    assert config[1]["Camera"] == 2
+
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(["configure", "--camera", "front"])
+
+
+# Test 4: Test Stats Subcommand
+def test_stats(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    front_dir = (
+        tmp_path / "data_warehouse" / "dataset" / "apple" / "train" / "good" / "Front"
+    )
+    front_dir.mkdir(parents=True)
+    cv2.imwrite(str(front_dir / "000.png"), np.full((8, 8, 3), 100, np.uint8))
+    assert main(["stats", "apple"]) == 0
+    assert (tmp_path / "data_warehouse" / "distribution" / "apple.json").exists()
+
+
+# Test 5: Test Bench Options Are Passed Through
+def test_bench_passthrough(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "src.multicamcomposepro.bench.main", lambda argv: calls.append(argv) or 0
+    )
+    assert main(["bench", "--resolutions", "640x480", "--repeats", "1"]) == 0
+    assert main(["bench", "--skip-augment"]) == 0
+    assert main(["bench", "--", "--repeats", "2"]) == 0
+    assert calls == [
+        ["--resolutions", "640x480", "--repeats", "1"],
+        ["--skip-augment"],
+        ["--repeats", "2"],
+    ]
+    with pytest.raises(SystemExit):
+        main(["stats", "apple", "--repeats", "1"])
@@ -0,0 +1,91 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_color.py
+# For Windows: $ python -m pytest tests/test_color.py
+
+import json
+from unittest.mock import Mock, patch
+
+import cv2
+import numpy as np
+import pytest
+
+from src.multicamcomposepro.camera import CameraManager
+from src.multicamcomposepro.color import (
+    CCM_KEY,
+    COLORCHECKER_BGR,
+    apply_ccm,
+    calibrate,
+    sample_patches,
+    save_ccm,
+)
+from src.multicamcomposepro.utils import Warehouse
+
+# Camera response that mixes channels and tints towards blue
+CAMERA = np.array([[0.9, 0.1, 0.05], [0.05, 0.8, 0.1], [0.0, 0.1, 0.7]])
+
+
+def chart(colors, patch=20, border=4):
+    """Render colors as a 4 x 6 grid of patches separated by black borders."""
+    img = np.zeros((4 * patch, 6 * patch, 3), np.uint8)
+    for i, color in enumerate(colors):
+        row, col = divmod(i, 6)
+        img[
+            row * patch + border : (row + 1) * patch - border,
+            col * patch + border : (col + 1) * patch - border,
+        ] = np.clip(np.round(color), 0, 255)
+    return img
+
+
+# Test 1: Test Patch Sampling Ignores Borders
+def test_sample_patches():
+    img = chart(COLORCHECKER_BGR)
+    np.testing.assert_allclose(sample_patches(img), np.round(COLORCHECKER_BGR))
+
+    padded = np.zeros((100, 140, 3), np.uint8)
+    padded[10:90, 15:135] = img
+    patches = sample_patches(padded, box=(15, 10, 120, 80))
+    np.testing.assert_allclose(patches, np.round(COLORCHECKER_BGR))
+
+
+# Test 2: Test Calibration Recovers The Inverse Camera Response
+def test_calibrate():
+    seen = chart(COLORCHECKER_BGR @ CAMERA.T)
+    matrix = calibrate(seen)
+    np.testing.assert_allclose(matrix, np.linalg.inv(CAMERA), atol=0.02)
+
+    corrected = apply_ccm(seen, matrix)
+    assert corrected.dtype == np.uint8
+    error = np.abs(sample_patches(corrected) - COLORCHECKER_BGR)
+    assert error.mean() < 2
+
+    with pytest.raises(ValueError):
+        calibrate(seen, reference=COLORCHECKER_BGR[:2])
+
+
+# Test 3: Test Matrix Is Stored And Applied On Capture
+def test_capture_applies_matrix(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = [{"Camera": 3, "Angle": "Front", "Resolution": "400 x 400"}]
+    (tmp_path / "camera_config.json").write_text(json.dumps(config))
+    matrix = np.diag([0.5, 1.0, 2.0])
+    save_ccm(3, matrix)
+    assert json.loads((tmp_path / "camera_config.json").read_text())[0][CCM_KEY]
+    with pytest.raises(ValueError):
+        save_ccm(7, matrix)
+
+    frame = np.full((4, 4, 3), 100, np.uint8)
+    cap = Mock()
+    cap.read.return_value = (True, frame)
+    manager = CameraManager(Mock(spec=Warehouse))
+    manager.captures = [cap]
+    filename = manager.capture_single_image(str(tmp_path), 0, "Front", 0)
+    np.testing.assert_array_equal(cv2.imread(filename)[0, 0], [50, 100, 200])
+
+    # Without initialized captures the index is a device index, as in QuickCapture
+    config.append({"Camera": 0, "Angle": "Left", "Resolution": "400 x 400"})
+    (tmp_path / "camera_config.json").write_text(json.dumps(config))
+    save_ccm(3, matrix)
+    manager = CameraManager(Mock(spec=Warehouse))
+    with patch("src.multicamcomposepro.camera.wcap", return_value=cap):
+        np.testing.assert_array_equal(manager.read_frame(3)[0, 0], [50, 100, 200])
+        np.testing.assert_array_equal(manager.read_frame(0)[0, 0], [100, 100, 100])
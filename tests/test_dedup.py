@@ -0,0 +1,88 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_dedup.py
+# For Windows: $ python -m pytest tests/test_dedup.py
+
+import os
+import random
+from unittest.mock import Mock
+
+import cv2
+import numpy as np
+import pytest
+
+from src.multicamcomposepro.camera import CameraManager
+from src.multicamcomposepro.dedup import BKTree, deduplicate, hamming, phash
+from src.multicamcomposepro.utils import Warehouse
+
+
+def pattern(seed, shape=(120, 160, 3)):
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    return cv2.resize(small, (shape[1], shape[0]), interpolation=cv2.INTER_CUBIC)
+
+
+@pytest.fixture
+def front_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    front_dir = (
+        tmp_path / "data_warehouse" / "dataset" / "apple" / "train" / "good" / "Front"
+    )
+    front_dir.mkdir(parents=True)
+    noisy = pattern(0).astype(np.int16) + np.random.default_rng(1).integers(
+        -3, 4, (120, 160, 3)
+    )
+    cv2.imwrite(str(front_dir / "000.png"), pattern(0))
+    cv2.imwrite(str(front_dir / "001.png"), np.clip(noisy, 0, 255).astype(np.uint8))
+    cv2.imwrite(str(front_dir / "002.png"), pattern(2))
+    cv2.imwrite(str(front_dir / "000_aug_0.png"), pattern(0))
+    return front_dir
+
+
+# Test 1: Test Hash Is Stable Under Noise And Differs Between Images
+def test_phash():
+    noisy = np.clip(pattern(0).astype(np.int16) + 2, 0, 255).astype(np.uint8)
+    assert hamming(phash(pattern(0)), phash(noisy)) <= 4
+    assert hamming(phash(pattern(0)), phash(pattern(2))) > 10
+    assert phash(pattern(0)) == phash(cv2.cvtColor(pattern(0), cv2.COLOR_BGR2GRAY))
+
+
+# Test 2: Test BK-Tree Search Matches Brute Force
+def test_bk_tree():
+    rng = random.Random(0)
+    values = [rng.getrandbits(64) for _ in range(300)]
+    tree = BKTree()
+    for i, value in enumerate(values):
+        tree.add(value, i)
+    assert len(tree) == 300
+
+    query = values[7] ^ 0b1011
+    expected = sorted(
+        (hamming(query, value), i)
+        for i, value in enumerate(values)
+        if hamming(query, value) <= 20
+    )
+    assert sorted(tree.search(query, 20)) == expected
+    assert tree.search(query, 3)[0] == (3, 7)
+
+
+# Test 3: Test Dedup Pass Reports And Removes Near-Duplicates
+def test_deduplicate(front_dir):
+    duplicates = deduplicate("apple")
+    assert [os.path.basename(d["path"]) for d in duplicates] == ["001.png"]
+    assert os.path.basename(duplicates[0]["duplicate_of"]) == "000.png"
+    assert (front_dir / "001.png").exists()
+
+    deduplicate("apple", remove=True)
+    assert sorted(os.listdir(front_dir)) == ["000.png", "000_aug_0.png", "002.png"]
+
+
+# Test 4: Test Inline Check Removes The Stale Frame At A Skipped Index
+def test_capture_skips_near_duplicates(front_dir):
+    warehouse = Mock(spec=Warehouse)
+    warehouse.catalog = None
+    manager = CameraManager(warehouse, dedup_threshold=4)
+    folder = str(front_dir.parent)
+    assert manager.save_frame(folder, 0, "Front", 0, pattern(5)).endswith("000.png")
+    assert manager.save_frame(folder, 0, "Front", 1, pattern(5)) is None
+    assert not (front_dir / "001.png").exists()  # Earlier session's frame removed
+    assert (front_dir / "002.png").exists()
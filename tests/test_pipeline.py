@@ -0,0 +1,140 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_pipeline.py
+# For Windows: $ python -m pytest tests/test_pipeline.py
+
+import json
+import random
+
+import numpy as np
+import pytest
+
+from src.multicamcomposepro.augment import DataAugmenter
+from src.multicamcomposepro.pipeline import (
+    AugmentationOp,
+    AugmentationPipeline,
+    PipelineProfiler,
+)
+
+
+@pytest.fixture
+def image():
+    return np.random.RandomState(0).randint(0, 255, (60, 80, 3), dtype=np.uint8)
+
+
+# Test 1: Test Default Pipeline Matches The Standard Chain
+def test_default_pipeline():
+    names = [op.name for op in AugmentationPipeline().ops]
+    assert names[0] == "white_balance"
+    assert names[-1] == "pixel_dropout"
+    assert AugmentationPipeline().ops[names.index("mirror")].p == 0.0
+
+
+# Test 2: Test Loading From JSON
+def test_from_json(tmp_path):
+    path = tmp_path / "pipeline.json"
+    path.write_text(
+        json.dumps(
+            {
+                "ops": [
+                    {"op": "rotation", "p": 0.5, "params": {"angle_range": [-5, 5]}},
+                    {"op": "gaussian_blur"},
+                ]
+            }
+        )
+    )
+    pipeline = AugmentationPipeline.from_json(str(path))
+    assert [op.name for op in pipeline.ops] == ["rotation", "gaussian_blur"]
+    assert pipeline.ops[0].params == {"angle_range": [-5, 5]}
+    assert (
+        DataAugmenter(logging_enabled=False, pipeline=str(path)).settings()["ops"]
+        == pipeline.to_dict()["ops"]
+    )
+
+
+# Test 3: Test Invalid Ops Are Rejected
+def test_invalid_op():
+    with pytest.raises(ValueError):
+        AugmentationOp("sharpen")
+    with pytest.raises(ValueError):
+        AugmentationOp("rotation", p=1.5)
+
+
+# Test 4: Test Probabilities And Parameter Ranges
+def test_apply(image):
+    augmenter = DataAugmenter(logging_enabled=False)
+    pipeline = AugmentationPipeline.from_dict(
+        {
+            "ops": [
+                {"op": "mirror", "p": 0.0},
+                {"op": "exposure", "params": {"factor_range": [2.0, 2.0]}},
+            ]
+        }
+    )
+    out, applied = pipeline.apply(augmenter, image)
+    assert [name for name, _ in applied] == ["exposure"]
+    assert out.dtype == np.uint8
+    np.testing.assert_array_equal(out, np.clip(image.astype(int) * 2, 0, 255))
+
+
+# Test 5: Test Profiler Report
+def test_profiler(image):
+    profiler = PipelineProfiler()
+    augmenter = DataAugmenter(logging_enabled=False, profiler=profiler)
+    augmenter.pipeline.apply(augmenter, image, "a.png", profiler)
+    report = profiler.report()
+    assert report["ops"]["rotation"]["calls"] == 1
+    assert set(report["resolutions"]["80x60"]) == set(report["ops"])
+    assert report["images"]["a.png"] > 0
+    assert "rotation" in profiler.summary()
+
+
+# Test 6: Test Old Lens Distortion factor_range Still Loads
+def test_lens_distortion_factor_range(image):
+    pipeline = AugmentationPipeline.from_dict(
+        {"ops": [{"op": "lens_distortion", "params": {"factor_range": [1.02, 1.02]}}]}
+    )
+    augmenter = DataAugmenter(logging_enabled=False)
+    out, [(name, coefficients)] = pipeline.apply(augmenter, image)
+    assert out.shape == image.shape
+    assert coefficients == augmenter.remap_cache.quantise(0.02, 0.0)
+
+
+# Test 7: Test Disabled Ops Do Not Shift The Random Sequence
+def test_disabled_op_keeps_random_state(image):
+    augmenter = DataAugmenter(logging_enabled=False)
+    rotation = {"op": "rotation", "params": {"angle_range": [-10, 10]}}
+    outputs = []
+    for ops in ([rotation], [{"op": "mirror", "p": 0.0}, rotation]):
+        random.seed(0)
+        _, applied = AugmentationPipeline.from_dict({"ops": ops}).apply(
+            augmenter, image
+        )
+        outputs.append(applied)
+    assert outputs[0] == outputs[1]
+
+
+# Test 8: Test A Mirror Op With p=1 Always Flips
+def test_mirror_probability(image):
+    pipeline = AugmentationPipeline.from_dict({"ops": [{"op": "mirror", "p": 1.0}]})
+    augmenter = DataAugmenter(logging_enabled=False)
+    for _ in range(10):
+        out, applied = pipeline.apply(augmenter, image)
+        assert applied == [("mirror", True)]
+        np.testing.assert_array_equal(out, image[:, ::-1])
+
+
+# Test 9: Test In-Place Ops Never Write Into The Caller's Image
+def test_in_place_op_keeps_input(image):
+    pipeline = AugmentationPipeline.from_dict(
+        {"ops": [{"op": "pixel_dropout", "params": {"rate": 0.5}}]}
+    )
+    augmenter = DataAugmenter(logging_enabled=False)
+    original = image.copy()
+    out, _ = pipeline.apply(augmenter, image)
+    np.testing.assert_array_equal(image, original)
+    assert not np.array_equal(out, original)
+
+    views = [image.copy(), image.copy()]
+    pipeline.apply_group(augmenter, views)
+    for view in views:
+        np.testing.assert_array_equal(view, original)
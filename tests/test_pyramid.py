@@ -0,0 +1,119 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_pyramid.py
+# For Windows: $ python -m pytest tests/test_pyramid.py
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.multicamcomposepro.pyramid import PyramidCache
+from src.multicamcomposepro.utils import batch_resize
+
+
+def smooth_image(seed, shape=(256, 384, 3)):
+    small = np.random.default_rng(seed).integers(0, 256, (8, 12, 3), dtype=np.uint8)
+    return cv2.resize(small, (shape[1], shape[0]), interpolation=cv2.INTER_CUBIC)
+
+
+@pytest.fixture
+def source_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source_dir = tmp_path / "in" / "train" / "good" / "Front"
+    source_dir.mkdir(parents=True)
+    for i in range(3):
+        cv2.imwrite(str(source_dir / f"{i:03d}.png"), smooth_image(i))
+    return source_dir
+
+
+# Test 1: Test Power-Of-Two Levels And Nearest Level Lookup
+def test_levels(source_dir):
+    pyramid = PyramidCache(min_size=32)
+    assert pyramid.level_sizes(384, 256) == [(192, 128), (96, 64), (48, 32)]
+
+    source = str(source_dir / "000.png")
+    assert pyramid.update([source]) == 1
+    assert os.path.basename(pyramid.get(source, 60)) == "96x64.png"
+    assert os.path.basename(pyramid.get(source, 100)) == "192x128.png"
+    assert pyramid.get(source, 200) == source
+    assert pyramid.load(source, 30).shape == (32, 48, 3)
+
+    # Unchanged sources are not rebuilt, also by a new instance
+    assert PyramidCache(min_size=32).update([source]) == 0
+    assert PyramidCache(sizes=[100, 50]).level_sizes(384, 256) == [(150, 100), (75, 50)]
+
+
+# Test 2: Test Changed Source Gets A New Pyramid
+def test_invalidation(source_dir):
+    pyramid = PyramidCache()
+    source = str(source_dir / "000.png")
+    old_level = pyramid.get(source, 64)
+
+    cv2.imwrite(source, smooth_image(9))
+    new_level = pyramid.get(source, 64)
+    assert new_level != old_level
+    assert not os.path.exists(old_level)
+    expected = cv2.resize(
+        cv2.resize(smooth_image(9), (192, 128), interpolation=cv2.INTER_AREA),
+        (96, 64),
+        interpolation=cv2.INTER_AREA,
+    )
+    np.testing.assert_array_equal(cv2.imread(new_level), expected)
+
+
+# Test 3: Test batch_resize Serves Targets From The Pyramid
+def test_batch_resize_with_pyramid(source_dir, tmp_path):
+    root = str(tmp_path / "in")
+    batch_resize(root, str(tmp_path / "direct"), (64, 64))
+    pyramid = PyramidCache()
+    assert batch_resize(root, str(tmp_path / "cached"), (64, 64), pyramid=pyramid) == 3
+    assert len(pyramid.index) == 3
+
+    relative = os.path.join("train", "good", "Front", "001.png")
+    with Image.open(tmp_path / "direct" / relative) as a, Image.open(
+        tmp_path / "cached" / relative
+    ) as b:
+        assert b.size == (64, 64)
+        difference = np.abs(np.asarray(a, np.int16) - np.asarray(b, np.int16))
+        assert difference.mean() < 3
+
+
+# Test 4: Test Unreadable Sources Fall Back And Deleted Sources Are Pruned
+def test_unreadable_and_deleted(source_dir):
+    garbage = source_dir / "003.png"
+    garbage.write_bytes(b"not an image")
+    truncated = source_dir / "004.png"
+    truncated.write_bytes((source_dir / "000.png").read_bytes()[:200])
+
+    pyramid = PyramidCache()
+    sources = sorted(str(path) for path in source_dir.iterdir())
+    assert pyramid.update(sources) == 3
+    assert len(pyramid.index) == 3
+    assert pyramid.get(str(garbage), 64) == str(garbage)
+    assert pyramid.get(str(truncated), 64) == str(truncated)
+
+    level = pyramid.get(sources[0], 64)
+    os.remove(sources[0])
+    assert pyramid.update(sources[1:3]) == 0
+    assert len(PyramidCache().index) == 2
+    assert not os.path.exists(level)
+
+
+# Test 5: Test Changing Sizes Adds The Missing Levels
+def test_changed_sizes(source_dir):
+    source = str(source_dir / "000.png")
+    PyramidCache(sizes=[128]).update([source])
+
+    pyramid = PyramidCache(sizes=[128, 64])
+    assert pyramid.entry(source) is None
+    assert pyramid.update([source]) == 1
+    for side in (64, 128):
+        assert os.path.exists(pyramid.get(source, side))
+    assert os.path.basename(pyramid.get(source, 64)) == "96x64.png"
+
+    # Removing a level file invalidates the entry
+    os.remove(pyramid.get(source, 64))
+    assert pyramid.entry(source) is None
+    assert os.path.exists(pyramid.get(source, 64))
@@ -0,0 +1,99 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_session.py
+# For Windows: $ python -m pytest tests/test_session.py
+
+import os
+import threading
+import time
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from src.multicamcomposepro.augment import DataAugmenter
+from src.multicamcomposepro.camera import CameraManager
+from src.multicamcomposepro.session import AugmentationStage, PipelinedSession
+from src.multicamcomposepro.utils import Warehouse
+
+
+class FakeCapture:
+    def __init__(self, value):
+        self.value = value
+
+    def read(self):
+        return True, np.full((16, 16, 3), self.value, np.uint8)
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    warehouse = Mock(spec=Warehouse)
+    warehouse.object_name = "apple"
+    warehouse.anomalies = ["scratch"]
+    warehouse.clean_folder_name.side_effect = lambda name: name.replace(" ", "_")
+    warehouse.catalog = Warehouse().catalog
+    manager = CameraManager(
+        warehouse, test_anomaly_images=1, train_images=3, allow_user_input=False
+    )
+    manager.camera_angles = ["Front", "skip", "Left"]
+    manager.captures = [FakeCapture(10), FakeCapture(20), FakeCapture(30)]
+    manager.initialize_cameras = lambda: None
+    return manager
+
+
+# Test 1: Test Only Train Sets Are Augmented, Before Run Returns
+def test_pipelined_session(manager, tmp_path):
+    sets = []
+    manager.on_capture_set = lambda folder, filenames: sets.append(filenames)
+    augmenter = DataAugmenter("apple", num_augmented_images=2, logging_enabled=False)
+
+    report = PipelinedSession(manager, augmenter).run()
+
+    assert report["sets"] == 3 and report["failed"] == 0
+    assert len(sets) == 5  # 3 train, 1 test good, 1 anomaly set, hook still called
+    assert manager.on_capture_set is not None
+    dataset = tmp_path / "data_warehouse" / "dataset" / "apple"
+    for angle in ("Front", "Left"):
+        names = sorted(os.listdir(dataset / "train" / "good" / angle))
+        assert len(names) == 3 + 3 * 2
+        assert "002_aug_1.png" in names
+        assert not any(
+            "aug" in name for name in os.listdir(dataset / "test" / "good" / angle)
+        )
+    assert 0 <= report["overlapped"] <= report["augment"]
+    assert augmenter.catalog is manager.warehouse.catalog
+    assert manager.warehouse.catalog.count(provenance="augmented") == 12
+
+
+# Test 2: Test The Queue Is Bounded And Close Is A Barrier
+def test_stage_backpressure():
+    release = threading.Event()
+    augmenter = Mock()
+    augmenter.augment_images.side_effect = lambda selected_images: release.wait(5)
+    stage = AugmentationStage(augmenter, max_pending=1)
+
+    stage.submit("set", ["/a/Front/000.png", "/a/Left/000.png"])
+    time.sleep(0.05)  # The worker takes the first set
+    stage.submit("set", ["/a/Front/001.png"])
+    blocked = threading.Thread(target=stage.submit, args=("set", ["/a/002.png"]))
+    blocked.start()
+    time.sleep(0.05)
+    assert blocked.is_alive()
+
+    release.set()
+    blocked.join(5)
+    stage.close()
+    assert [
+        call.kwargs["selected_images"]
+        for call in augmenter.augment_images.call_args_list
+    ] == [
+        ["000.png"],
+        ["001.png"],
+        ["002.png"],
+    ]
+    assert stage.stall_time > 0
+    with pytest.raises(ValueError):
+        AugmentationStage(augmenter, max_pending=0)
@@ -0,0 +1,101 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_shards.py
+# For Windows: $ python -m pytest tests/test_shards.py
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from src.multicamcomposepro.shards import ShardReader, ShardWriter
+
+
+def write_image(path, value):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(path), np.full((30, 40, 3), value, np.uint8))
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    object_dir = tmp_path / "data_warehouse" / "dataset" / "apple"
+    for i in range(3):
+        write_image(object_dir / "train" / "good" / "Front" / f"{i:03d}.png", i)
+    write_image(object_dir / "train" / "good" / "Front" / "000_aug_0.png", 50)
+    write_image(object_dir / "test" / "cracked" / "Left" / "000.png", 100)
+    return object_dir
+
+
+# Test 1: Test Export And Read Back
+def test_export_and_read(dataset):
+    writer = ShardWriter("apple", image_size=(8, 8), shard_size=2, workers=1)
+    assert writer.export() == 5
+
+    reader = ShardReader(writer.output_dir)
+    assert len(reader) == 5
+    assert len(reader.index["shards"]) == 3
+    for image, record in reader:
+        assert image.shape == (8, 8, 3)
+        original = cv2.imread(os.path.join(writer.object_dir, record["path"]))
+        assert image[0, 0, 0] == original[0, 0, 0]
+
+    (anomaly,) = reader.select(split="test")
+    assert (anomaly["label"], anomaly["angle"]) == ("cracked", "Left")
+    assert [r["path"] for r in reader.select(augmented=True)] == [
+        os.path.join("train", "good", "Front", "000_aug_0.png")
+    ]
+    images, records = next(reader.batches(2, split="train"))
+    assert images.shape == (2, 8, 8, 3)
+
+
+# Test 2: Test Incremental Append Only Exports New Captures
+def test_incremental_export(dataset):
+    ShardWriter("apple", image_size=(8, 8), shard_size=4, workers=1).export()
+    write_image(dataset / "train" / "good" / "Front" / "003.png", 3)
+
+    writer = ShardWriter("apple", image_size=(8, 8), shard_size=4, workers=1)
+    assert len(writer.pending()) == 1
+    assert writer.export() == 1
+    assert writer.export() == 0
+
+    reader = ShardReader(writer.output_dir)
+    assert len(reader) == 6
+    assert [shard["count"] for shard in reader.index["shards"]] == [4, 2]
+
+
+# Test 3: Test Parallel Export
+def test_parallel_export(dataset):
+    writer = ShardWriter("apple", image_size=(8, 8), workers=2)
+    assert writer.export() == 5
+    assert len(ShardReader(writer.output_dir)) == 5
+
+
+# Test 4: Test Unreadable Files Are Skipped And Deleted Ones Pruned
+@pytest.mark.parametrize("workers", [1, 2])
+def test_unreadable_and_deleted(dataset, workers):
+    (dataset / "train" / "good" / "Front" / "001.png").write_bytes(b"not an image")
+    writer = ShardWriter("apple", image_size=(8, 8), shard_size=3, workers=workers)
+    assert writer.export() == 4
+    assert not [name for name in os.listdir(writer.output_dir) if ".tmp" in name]
+
+    reader = ShardReader(writer.output_dir)
+    assert [shard["count"] for shard in reader.index["shards"]] == [3, 1]
+    for image, record in reader:
+        original = cv2.imread(os.path.join(writer.object_dir, record["path"]))
+        assert image[0, 0, 0] == original[0, 0, 0]
+
+    os.remove(dataset / "test" / "cracked" / "Left" / "000.png")
+    writer = ShardWriter("apple", image_size=(8, 8), shard_size=3, workers=workers)
+    assert writer.export() == 0
+    assert len(ShardReader(writer.output_dir)) == 3
+
+    def fail(job):
+        raise RuntimeError("decoder crashed")
+
+    write_image(dataset / "train" / "good" / "Front" / "004.png", 4)
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr("src.multicamcomposepro.shards._load_square_job", fail)
+        with pytest.raises(RuntimeError):
+            ShardWriter("apple", image_size=(8, 8), shard_size=3, workers=1).export()
+    assert not [name for name in os.listdir(writer.output_dir) if ".tmp" in name]
@@ -0,0 +1,85 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_stats.py
+# For Windows: $ python -m pytest tests/test_stats.py
+
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from src.multicamcomposepro import stats as stats_module
+from src.multicamcomposepro.stats import ChannelStats, DatasetStatistics
+
+
+def random_image(seed, shape=(20, 30, 3)):
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+@pytest.fixture
+def object_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    object_dir = tmp_path / "data_warehouse" / "dataset" / "apple"
+    for split, label in (("train", "good"), ("test", "scratch")):
+        angle_dir = object_dir / split / label / "Front"
+        angle_dir.mkdir(parents=True)
+        for i in range(2):
+            cv2.imwrite(str(angle_dir / f"{i:03d}.png"), random_image(i))
+    return object_dir
+
+
+# Test 1: Test Merged Accumulators Match Direct Computation
+def test_channel_stats_merge():
+    images = [random_image(0), random_image(1, (10, 10, 3)), random_image(2)]
+    merged = ChannelStats()
+    for img in images:
+        part = ChannelStats()
+        part.update(img)
+        merged.merge(part)
+
+    pixels = np.concatenate([img.reshape(-1, 3) for img in images]).astype(np.float64)
+    np.testing.assert_allclose(merged.mean, pixels.mean(axis=0))
+    np.testing.assert_allclose(merged.std, pixels.std(axis=0))
+    assert merged.histogram[1].sum() == len(pixels)
+    assert merged.resolutions == {"30x20": 2, "10x10": 1}
+
+    restored = ChannelStats.from_dict(json.loads(json.dumps(merged.to_dict())))
+    np.testing.assert_allclose(restored.std, merged.std)
+
+
+# Test 2: Test Update Writes Summary To Distribution Directory
+def test_update(object_dir):
+    summary = DatasetStatistics("apple").update()
+    assert os.path.exists("data_warehouse/distribution/apple.json")
+    assert summary["total"]["images"] == 4
+    assert set(summary["splits"]) == {"train", "test"}
+    assert summary["labels"]["scratch"]["images"] == 2
+    assert summary["angles"]["Front"]["resolutions"] == {"30x20": 4}
+
+
+# Test 3: Test Incremental Update Only Decodes New Files
+def test_incremental_update(object_dir, monkeypatch):
+    DatasetStatistics("apple").update()
+
+    decoded = []
+    image_stats = stats_module.image_stats
+    monkeypatch.setattr(
+        stats_module, "image_stats", lambda path: decoded.append(path) or image_stats(path)
+    )
+    good_dir = object_dir / "train" / "good" / "Front"
+    cv2.imwrite(str(good_dir / "002.png"), random_image(5))
+    summary = DatasetStatistics("apple").update()
+    assert [os.path.basename(path) for path in decoded] == ["002.png"]
+    assert summary["splits"]["train"]["images"] == 3
+
+    # Removing a file recomputes only its group
+    decoded.clear()
+    os.remove(good_dir / "000.png")
+    summary = DatasetStatistics("apple").update()
+    assert sorted(os.path.basename(path) for path in decoded) == ["001.png", "002.png"]
+    assert summary["total"]["images"] == 4
+
+    fresh = DatasetStatistics("apple", output_dir="fresh").update()
+    np.testing.assert_allclose(summary["total"]["mean"], fresh["total"]["mean"])
+    np.testing.assert_allclose(summary["total"]["std"], fresh["total"]["std"])
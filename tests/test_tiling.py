@@ -0,0 +1,91 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_tiling.py
+# For Windows: $ python -m pytest tests/test_tiling.py
+
+import random
+
+import cv2
+import numpy as np
+import pytest
+
+from src.multicamcomposepro.augment import DataAugmenter
+from src.multicamcomposepro.distortion import radial_distortion_maps
+from src.multicamcomposepro.tiling import (
+    gaussian_blur_tiled,
+    remap_tiled,
+    rows_for_budget,
+    strip_ranges,
+    workers_for_memory,
+)
+from src.multicamcomposepro.utils import batch_resize
+
+
+@pytest.fixture
+def image():
+    return np.random.RandomState(0).randint(0, 255, (97, 64, 3), dtype=np.uint8)
+
+
+# Test 1: Test Tiled Blur And Remap Match The Whole-Frame Ops Exactly
+@pytest.mark.parametrize("rows", [1, 5, 32, 96])
+def test_tiled_ops_exact(image, rows):
+    for sigma in (0.3, 1.0, 2.7):
+        expected = cv2.GaussianBlur(image, (0, 0), sigma)
+        tiled = gaussian_blur_tiled(image, sigma, np.empty_like(image), rows)
+        np.testing.assert_array_equal(tiled, expected)
+
+    height, width = image.shape[:2]
+    map1, map2 = radial_distortion_maps(height, width, 0.3, -0.1)
+    expected = cv2.remap(image, map1, map2, cv2.INTER_LINEAR)
+    tiled = remap_tiled(
+        image,
+        lambda y0, y1: radial_distortion_maps(height, width, 0.3, -0.1, y0, y1),
+        np.empty_like(image),
+        rows,
+    )
+    np.testing.assert_array_equal(tiled, expected)
+    assert list(strip_ranges(10, 4)) == [(0, 4), (4, 8), (8, 10)]
+
+
+# Test 2: Test Tiled Augmenter Output Is Identical To Untiled Output
+def test_augmenter_tiled_matches(image):
+    def augment(**kwargs):
+        augmenter = DataAugmenter(logging_enabled=False, **kwargs)
+        random.seed(3)
+        np.random.seed(3)
+        outputs = []
+        for _ in range(5):
+            out, _ = augmenter.pipeline.apply(augmenter, image)
+            outputs.append(out.copy())
+        return outputs
+
+    expected = augment()
+    for kwargs in ({"tile_rows": 7}, {"memory_budget": 64 * 32 * 10}):
+        for out, ref in zip(augment(**kwargs), expected):
+            np.testing.assert_array_equal(out, ref)
+
+    augmenter = DataAugmenter(logging_enabled=False, memory_budget=1 << 30)
+    assert augmenter.tile_rows_for(image) is None
+    assert rows_for_budget(64, 1) == 1
+
+
+# Test 3: Test Worker Count Follows The Memory Budget
+def test_workers_for_memory(tmp_path):
+    assert workers_for_memory(100, max_workers=8, memory_budget=350) == 3
+    assert workers_for_memory(100, max_workers=2, memory_budget=10**6) == 2
+    assert workers_for_memory(100, max_workers=8, memory_budget=10) == 1
+    assert workers_for_memory(0, max_workers=4, memory_budget=10) == 4
+
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(3):
+        cv2.imwrite(str(src / f"{i}.png"), np.zeros((40, 40, 3), np.uint8))
+    # A budget below one image forces the serial path
+    n = batch_resize(
+        str(src), str(tmp_path / "out"), (16, 16), workers=4, memory_budget=1
+    )
+    assert n == 3
+
+    # Unreadable sources do not break the memory estimate
+    (src / "3.png").write_bytes(b"not an image")
+    n = batch_resize(str(src), str(tmp_path / "par"), (16, 16), workers=2)
+    assert n == 3
@@ -0,0 +1,62 @@
+# To run manually
+# Unix systems: run from root with python3 -m pytest tests/test_utils.py
+# For Windows: $ python -m pytest tests/test_utils.py
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.multicamcomposepro.utils import batch_resize, center_crop_box
+
+
+@pytest.fixture
+def image_tree(tmp_path):
+    rng = np.random.RandomState(0)
+    for angle in ("Front", "Left"):
+        angle_dir = tmp_path / "in" / "train" / "good" / angle
+        angle_dir.mkdir(parents=True)
+        for i in range(3):
+            pixels = rng.randint(0, 255, (120, 200, 3), dtype=np.uint8)
+            Image.fromarray(pixels).save(angle_dir / f"{i:03d}.png")
+        Image.fromarray(pixels).save(angle_dir / "big.jpg", quality=95)
+        (angle_dir / "notes.txt").write_text("not an image")
+    return tmp_path
+
+
+# Test 1: Test Centre Crop Box
+def test_center_crop_box():
+    assert center_crop_box(200, 120) == (40, 0, 160, 120)
+    assert center_crop_box(120, 201) == (0, 40, 120, 161)
+    assert center_crop_box(50, 50) == (0, 0, 50, 50)
+
+
+# Test 2: Test Parallel Resize Matches Sequential Resize
+def test_batch_resize_parallel(image_tree):
+    n = batch_resize(str(image_tree / "in"), str(image_tree / "seq"), (32, 32))
+    assert n == 8
+    n = batch_resize(
+        str(image_tree / "in"), str(image_tree / "par"), (32, 32), workers=2
+    )
+    assert n == 8
+
+    for path in (image_tree / "seq").rglob("*.*"):
+        parallel = image_tree / "par" / path.relative_to(image_tree / "seq")
+        with Image.open(path) as a, Image.open(parallel) as b:
+            assert a.size == (32, 32)
+            np.testing.assert_array_equal(np.asarray(a), np.asarray(b))
+
+
+# Test 3: Test Existing Outputs Are Skipped
+def test_batch_resize_skips_existing(image_tree):
+    batch_resize(str(image_tree / "in"), str(image_tree / "out"), (16, 16))
+    assert batch_resize(str(image_tree / "in"), str(image_tree / "out"), (16, 16)) == 0
+
+
+# Test 4: Test Unreadable Files Are Skipped By Both Paths
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_resize_unreadable(image_tree, workers):
+    (image_tree / "in" / "train" / "good" / "Front" / "bad.png").write_bytes(b"x")
+    n = batch_resize(
+        str(image_tree / "in"), str(image_tree / "out"), (16, 16), workers=workers
+    )
+    assert n == 8